@@ -1,4 +1,5 @@
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -94,3 +95,42 @@ class BookAPITestCase(TestCase):
         self.client.login(username='testuser', password='testpass')
         response = self.client.get("/books/?ordering=publication_year")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class AnonymousBookCacheTestCase(TestCase):
+    def setUp(self):
+        """Cache anonymous reads under /api/books/ only, starting cold."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.author = Author.objects.create(name="John Doe")
+        Book.objects.create(title="Test Book", publication_year=2023, author=self.author)
+
+    def test_anonymous_book_list_is_cached(self):
+        """Anonymous reads are served from the cache until it expires."""
+        response = self.client.get("/api/books/")
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        Book.objects.create(title="Another Book", publication_year=2024, author=self.author)
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/books/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(len(response.data), 1)
+
+    def test_query_string_and_accept_get_their_own_entries(self):
+        """Filters and content negotiation change the cache key."""
+        self.client.get("/api/books/")
+        self.assertEqual(self.client.get("/api/books/?search=Test")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/books/", HTTP_ACCEPT="text/html")["X-Cache"], "MISS")
+
+    def test_logged_in_requests_bypass_cache(self):
+        """A session cookie means the response may be personal."""
+        self.client.get("/api/books/")
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get("/api/books/")
+        self.assertNotIn("X-Cache", response)
+
+    def test_other_paths_are_not_cached(self):
+        """Only the configured /api/books/ prefix goes through the cache."""
+        response = self.client.get("/admin/login/")
+        self.assertNotIn("X-Cache", response)
@@ -4,6 +4,7 @@ from django.db import models
 class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)  # Validator for conditional GETs
     
     def __str__(self):
         return self.title
@@ -2,14 +2,16 @@ from django.shortcuts import render
 from rest_framework import viewsets, generics, permissions
 from .models import Book
 from .serializers import BookSerializer
+from django_common.conditional import ConditionalGetMixin
 
 # Create your views here.
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows books to be viewed or edited.
     Requires authentication for all operations.
     Only staff users can create, update or delete books.
+    List and detail responses carry an ETag and answer 304 when unchanged.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
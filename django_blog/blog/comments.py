@@ -0,0 +1,68 @@
+"""
+Cursor pagination for post comment threads.
+
+Comments are read newest first in pages of ``BLOG_COMMENTS_PAGE_SIZE``. The
+cursor is the ``created_at`` and id of the last comment on the previous
+page, so every page is an index range scan on (post, created_at, id)
+rather than an OFFSET that grows with the thread.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+
+from .models import Comment
+
+
+def get_page_size():
+    return getattr(settings, 'BLOG_COMMENTS_PAGE_SIZE', 20)
+
+
+def encode_cursor(comment):
+    return f'{comment.created_at.isoformat()}_{comment.pk}'
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, pk)`` for a cursor, raising ValueError if malformed."""
+    created_at, _, pk = cursor.rpartition('_')
+    created_at = parse_datetime(created_at)
+    if created_at is None:
+        raise ValueError(f'Invalid comment cursor: {cursor!r}')
+    return created_at, int(pk)
+
+
+@dataclass
+class CommentPage:
+    post_id: int
+    comments: list
+    next_cursor: str | None
+
+    @property
+    def next_url(self):
+        if self.next_cursor is None:
+            return None
+        url = reverse('blog:post-comments', kwargs={'pk': self.post_id})
+        return f'{url}?{urlencode({"cursor": self.next_cursor})}'
+
+
+def get_comment_page(post_id, cursor=None, page_size=None):
+    page_size = page_size or get_page_size()
+    queryset = (
+        Comment.objects.filter(post_id=post_id)
+        .select_related('author')
+        .order_by('-created_at', '-pk')
+    )
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    # One extra row tells us whether there is a next page without a COUNT
+    comments = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(comments) > page_size:
+        comments = comments[:page_size]
+        next_cursor = encode_cursor(comments[-1])
+    return CommentPage(post_id, comments, next_cursor)
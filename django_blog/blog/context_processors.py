@@ -0,0 +1,7 @@
+from django.utils.functional import SimpleLazyObject
+from .tags import get_tag_cloud
+
+
+def tag_cloud(request):
+    """Expose the sidebar tag cloud; only read (from cache) if a template uses it."""
+    return {'tag_cloud': SimpleLazyObject(get_tag_cloud)}
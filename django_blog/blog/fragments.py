@@ -0,0 +1,51 @@
+"""
+Template fragment caching for the post detail page.
+
+The body and tag list fragments are keyed on the post id and its
+``updated_at`` timestamp, so editing a post moves it to fresh keys on its
+own. The comment thread is keyed on the post id alone. Signal handlers call
+the ``invalidate_*`` helpers for changes that don't touch ``updated_at``
+(comments, tags, deletes).
+
+Per-user markup (edit/delete links) never goes into these fragments, so a
+cached fragment is safe to share between every visitor. Post actions sit
+outside them, and a viewer with comments on the post gets the thread
+rendered uncached with their own comment actions.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+BODY_FRAGMENT = 'blog_post_body'
+TAGS_FRAGMENT = 'blog_post_tags'
+COMMENTS_FRAGMENT = 'blog_post_comments'
+
+
+def get_timeout():
+    return getattr(settings, 'BLOG_FRAGMENT_CACHE_TIMEOUT', 600)
+
+
+def version(post):
+    """The ``updated_at`` part of the body/tags keys, as used in the template."""
+    return post.updated_at.timestamp() if post.updated_at else ''
+
+
+def invalidate_bodies(posts):
+    """Drop the body fragments of posts whose stored HTML was rewritten."""
+    cache.delete_many([make_template_fragment_key(BODY_FRAGMENT, [post.pk, version(post)]) for post in posts])
+
+
+def invalidate_tags(post):
+    cache.delete(make_template_fragment_key(TAGS_FRAGMENT, [post.pk, version(post)]))
+
+
+def invalidate_comments(post_id):
+    cache.delete(make_template_fragment_key(COMMENTS_FRAGMENT, [post_id]))
+
+
+def invalidate_post(post):
+    cache.delete_many([
+        make_template_fragment_key(BODY_FRAGMENT, [post.pk, version(post)]),
+        make_template_fragment_key(TAGS_FRAGMENT, [post.pk, version(post)]),
+        make_template_fragment_key(COMMENTS_FRAGMENT, [post.pk]),
+    ])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.search import index_post
+
+class Command(BaseCommand):
+    help = 'Rebuilds the blog search index for every post'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of posts loaded from the database at a time')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('pk').prefetch_related('tags')
+        count = 0
+        for post in posts.iterator(chunk_size=options['chunk_size']):
+            index_post(post)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} posts'))
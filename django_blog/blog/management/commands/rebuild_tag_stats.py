@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from blog.tags import rebuild_tag_stats
+
+class Command(BaseCommand):
+    help = 'Recomputes the materialized post count and last use of every tag'
+
+    def handle(self, *args, **options):
+        count = rebuild_tag_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {count} tags'))
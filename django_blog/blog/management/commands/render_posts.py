@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from blog.fragments import invalidate_bodies
+from blog.models import Post
+from blog.rendering import render_post
+
+class Command(BaseCommand):
+    help = 'Re-renders the stored HTML and excerpt of blog posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of posts loaded and updated at a time')
+        parser.add_argument('--only-missing', action='store_true',
+                            help='Only render posts that have no stored HTML yet')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = Post.objects.order_by('pk').only('pk', 'content', 'updated_at')
+        if options['only_missing']:
+            posts = posts.filter(content_html='')
+
+        # bulk_update skips save() and its signals: the output only depends
+        # on content, which isn't changing here. updated_at stays put too, so
+        # the cached body fragments have to be dropped by hand.
+        count = 0
+        batch = []
+        for post in posts.iterator(chunk_size=chunk_size):
+            render_post(post)
+            batch.append(post)
+            if len(batch) >= chunk_size:
+                count += self.store(batch)
+                batch = []
+        if batch:
+            count += self.store(batch)
+        self.stdout.write(self.style.SUCCESS(f'Rendered {count} posts'))
+
+    def store(self, posts):
+        Post.objects.bulk_update(posts, ['content_html', 'excerpt'])
+        invalidate_bodies(posts)
+        return len(posts)
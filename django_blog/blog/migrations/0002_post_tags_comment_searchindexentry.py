@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+import django.db.models.deletion
+import taggit.managers
+from django.conf import settings
+from django.db import migrations, models
+
+from blog.search import score_terms
+
+BATCH_SIZE = 500
+
+
+def backfill_search_index(apps, schema_editor):
+    # Historical models can't follow taggit's generic relation, so read the
+    # tag names of blog posts through TaggedItem directly.
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    Post = apps.get_model('blog', 'Post')
+    SearchIndexEntry = apps.get_model('blog', 'SearchIndexEntry')
+    tag_names = {}
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if content_type is not None:
+        for object_id, name in TaggedItem.objects.filter(content_type=content_type).values_list(
+            'object_id', 'tag__name'
+        ):
+            tag_names.setdefault(object_id, []).append(name)
+
+    entries = []
+    posts = Post.objects.order_by('pk').values_list('pk', 'title', 'content')
+    for pk, title, content in posts.iterator(chunk_size=BATCH_SIZE):
+        scores = score_terms(title, content, tag_names.get(pk, ()))
+        entries.extend(SearchIndexEntry(term=term, post_id=pk, score=score) for term, score in scores.items())
+        if len(entries) >= BATCH_SIZE:
+            SearchIndexEntry.objects.bulk_create(entries)
+            entries = []
+    if entries:
+        SearchIndexEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='tags',
+            field=taggit.managers.TaggableManager(help_text='A comma-separated list of tags.', through='taggit.TaggedItem', to='taggit.Tag', verbose_name='Tags'),
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='blog.post')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('score', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='blog.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'post', 'score'], name='blog_search_term_52bc18_idx')],
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_tag_stats(apps, schema_editor):
+    # Historical models can't follow taggit's generic relation, so read the
+    # tagged items for blog posts directly.
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    Post = apps.get_model('blog', 'Post')
+    TagStat = apps.get_model('blog', 'TagStat')
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if content_type is None:
+        return
+    published = dict(Post.objects.values_list('pk', 'published_date'))
+    stats = {}
+    for tag_id, object_id in TaggedItem.objects.filter(content_type=content_type).values_list('tag_id', 'object_id'):
+        if object_id not in published:
+            continue
+        stat = stats.setdefault(tag_id, TagStat(tag_id=tag_id, post_count=0))
+        stat.post_count += 1
+        if stat.last_used is None or published[object_id] > stat.last_used:
+            stat.last_used = published[object_id]
+    TagStat.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_comment_thread_idx'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='blog_stat', serialize=False, to='taggit.tag')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('last_used', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-post_count', '-last_used'], name='blog_tagstat_popular_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_tag_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+from blog.rendering import render_content, render_excerpt
+
+BATCH_SIZE = 500
+
+
+def backfill_rendered_content(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.order_by('pk').only('pk', 'content').iterator(chunk_size=BATCH_SIZE):
+        post.content_html = render_content(post.content)
+        post.excerpt = render_excerpt(post.content)
+        batch.append(post)
+        if len(batch) >= BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['content_html', 'excerpt'])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['content_html', 'excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_tagstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_rendered_content, migrations.RunPython.noop),
+    ]
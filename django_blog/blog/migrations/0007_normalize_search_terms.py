@@ -0,0 +1,24 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Rebuild with the same backfill as 0002, which now produces normalized terms
+backfill_search_index = import_module(
+    'blog.migrations.0002_post_tags_comment_searchindexentry'
+).backfill_search_index
+
+
+def reindex_posts(apps, schema_editor):
+    apps.get_model('blog', 'SearchIndexEntry').objects.all().delete()
+    backfill_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_rendered_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_posts, migrations.RunPython.noop),
+    ]
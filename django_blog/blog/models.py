@@ -2,17 +2,45 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
 from taggit.managers import TaggableManager
+from taggit.models import Tag
+from .rendering import render_post
+
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Posts for list pages: author and tags loaded in bulk, and only the
+        stored excerpt fetched, not the full body.
+        """
+        return self.select_related('author').prefetch_related('tags').defer('content', 'content_html')
 
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Rendered from content on save; see blog.rendering
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
     published_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blog_posts')
     tags = TaggableManager()  # Add tags field
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Re-render whenever content is being written; a deferred content
+        # field can't have changed, so it's left alone.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            if 'content' not in self.get_deferred_fields():
+                render_post(self)
+        elif 'content' in update_fields:
+            render_post(self)
+            kwargs['update_fields'] = {*update_fields, 'content_html', 'excerpt'}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('blog:post-detail', kwargs={'pk': self.pk})
 
@@ -25,6 +53,46 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Backs the cursor-paginated comment thread on the post page
+            models.Index(fields=['post', '-created_at', '-id'], name='blog_comment_thread_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author} on {self.post}'
+
+class SearchIndexEntry(models.Model):
+    """
+    One posting in the blog's inverted search index: a term and the post it
+    occurs in, with a relevance score weighted towards titles and tags.
+    Maintained by blog.search; see blog/signals.py.
+    """
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_entries')
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+        indexes = [
+            models.Index(fields=['term', 'post', 'score']),
+        ]
+
+    def __str__(self):
+        return f'{self.term} -> {self.post_id} ({self.score})'
+
+class TagStat(models.Model):
+    """
+    Materialized usage statistics for a tag: how many posts carry it and the
+    newest of those posts. Kept current by blog.tags; see blog/signals.py.
+    """
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='blog_stat')
+    post_count = models.PositiveIntegerField(default=0)
+    last_used = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-post_count', '-last_used'], name='blog_tagstat_popular_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag_id}: {self.post_count}'
@@ -0,0 +1,29 @@
+"""
+Rendering pipeline for post content.
+
+Posts store their rendered HTML and a plain-text excerpt alongside the raw
+content (see Post.save), so pages read ready-made markup instead of running
+template filters over the full body on every request. Anything that changes
+how content is displayed belongs here; run ``render_posts`` afterwards to
+re-render existing posts.
+"""
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+# Words kept in the excerpt shown on list and search result cards
+EXCERPT_WORDS = 50
+
+
+def render_content(content):
+    """HTML for a post body: escaped text with paragraphs and line breaks."""
+    return linebreaks(content, autoescape=True)
+
+
+def render_excerpt(content):
+    return Truncator(content).words(EXCERPT_WORDS)
+
+
+def render_post(post):
+    """Fill in the rendered fields of ``post`` from its content; doesn't save."""
+    post.content_html = render_content(post.content)
+    post.excerpt = render_excerpt(post.content)
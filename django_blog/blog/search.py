@@ -0,0 +1,86 @@
+"""
+Inverted-index search for blog posts.
+
+Posts are tokenized into SearchIndexEntry rows when they or their tags
+change, so a search only reads the posting lists of the query's terms
+instead of scanning every post. Matches are ranked by the number of query
+terms they contain, then by score, where title and tag hits are boosted.
+"""
+import re
+import unicodedata
+from collections import Counter
+
+from django.db.models import Count, Sum
+
+from .models import Post, SearchIndexEntry
+
+TITLE_WEIGHT = 3
+CONTENT_WEIGHT = 1
+TAG_WEIGHT = 5
+
+MAX_TERM_LENGTH = 64
+TOKEN_RE = re.compile(r'\w+')
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that
+    the this to was were will with
+""".split())
+
+
+def normalize(text):
+    """
+    Casefold and strip accents, so "Café" and "cafe" or "Straße" and
+    "strasse" give the same term. MySQL's default collations compare them
+    as equal, which would break the unique (term, post) constraint.
+    """
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_RE.findall(normalize(text))
+        if len(token) > 1 and len(token) <= MAX_TERM_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def score_terms(title, content, tag_names):
+    scores = Counter()
+    for term in tokenize(title):
+        scores[term] += TITLE_WEIGHT
+    for term in tokenize(content):
+        scores[term] += CONTENT_WEIGHT
+    for name in tag_names:
+        for term in tokenize(name):
+            scores[term] += TAG_WEIGHT
+    return scores
+
+
+def index_post(post):
+    """Replace the index entries for a single post."""
+    tag_names = [tag.name for tag in post.tags.all()]
+    scores = score_terms(post.title, post.content, tag_names)
+    SearchIndexEntry.objects.filter(post=post).delete()
+    SearchIndexEntry.objects.bulk_create([
+        SearchIndexEntry(term=term, post=post, score=score) for term, score in scores.items()
+    ])
+
+
+def search(query):
+    """
+    Return (post id, matched terms, score) rows for `query`, best first.
+    The result is a lazy queryset and can be handed to a Paginator.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return SearchIndexEntry.objects.none().values('post_id')
+    return SearchIndexEntry.objects.filter(term__in=terms).values('post_id').annotate(
+        matched=Count('term'), total_score=Sum('score')
+    ).order_by('-matched', '-total_score', '-post_id')
+
+
+def load_posts(rows):
+    """Fetch the posts for a page of search rows, keeping their order."""
+    ids = [row['post_id'] for row in rows]
+    posts = Post.objects.for_listing().filter(pk__in=ids)
+    by_id = {post.pk: post for post in posts}
+    return [by_id[pk] for pk in ids if pk in by_id]
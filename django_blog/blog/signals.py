@@ -0,0 +1,67 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from taggit.models import Tag
+from .models import Comment, Post
+from . import fragments, search, tags
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def index_retagged_post(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Post):
+        search.index_post(instance)
+        fragments.invalidate_tags(instance)
+
+
+@receiver(post_save, sender=Tag)
+def index_posts_for_renamed_tag(sender, instance, created, **kwargs):
+    if created:
+        return
+    for post in Post.objects.filter(tags=instance).prefetch_related('tags').iterator(chunk_size=500):
+        search.index_post(post)
+        fragments.invalidate_tags(post)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_fragments(sender, instance, **kwargs):
+    fragments.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_fragments(sender, instance, **kwargs):
+    fragments.invalidate_comments(instance.post_id)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tag_stats(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Post):
+        return
+    if action == 'pre_clear':
+        instance._cleared_tag_ids = list(instance.tags.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        tags.refresh_tag_stats(getattr(instance, '_cleared_tag_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        tags.refresh_tag_stats(pk_set)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    # The tagged items are gone by post_delete, so note the tags now
+    instance._deleted_tag_ids = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def update_tag_stats_for_deleted_post(sender, instance, **kwargs):
+    tags.refresh_tag_stats(getattr(instance, '_deleted_tag_ids', ()))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_cloud(sender, **kwargs):
+    tags.invalidate_tag_cloud()
+
@@ -0,0 +1,108 @@
+"""
+Materialized tag statistics and the sidebar tag cloud.
+
+TagStat rows hold each tag's post count and last use so that listing
+popular tags is one indexed read instead of a GROUP BY over taggit's
+through table. When a post's tags change only the affected tags are
+recounted; ``rebuild_tag_stats`` recomputes the whole table.
+
+The tag cloud itself is cached and dropped whenever any statistic changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Count, Max
+
+from .models import Post, TagStat
+
+TAG_CLOUD_CACHE_KEY = 'blog:tag_cloud'
+TAG_CLOUD_LEVELS = 5
+
+
+def tag_usage(tag_ids=None):
+    """Post count and newest post date per tag, as ``{tag_id: (count, last_used)}``."""
+    # A single filter() so the grouping reuses the same tag join
+    if tag_ids is None:
+        queryset = Post.objects.filter(tags__isnull=False)
+    else:
+        queryset = Post.objects.filter(tags__in=tag_ids)
+    rows = (
+        queryset.order_by()
+        .values('tags')
+        .annotate(post_count=Count('pk'), last_used=Max('published_date'))
+    )
+    return {row['tags']: (row['post_count'], row['last_used']) for row in rows}
+
+
+@transaction.atomic
+def refresh_tag_stats(tag_ids):
+    """Recount the given tags; tags no longer on any post drop to zero."""
+    tag_ids = set(tag_ids)
+    if not tag_ids:
+        return
+    usage = tag_usage(tag_ids)
+    stats = []
+    for tag_id in tag_ids:
+        post_count, last_used = usage.get(tag_id, (0, None))
+        stats.append(TagStat(tag_id=tag_id, post_count=post_count, last_used=last_used))
+    TagStat.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=upsert_target(),
+        update_fields=['post_count', 'last_used'],
+    )
+    invalidate_tag_cloud()
+
+
+def upsert_target():
+    # MySQL's ON DUPLICATE KEY UPDATE can't name a conflict target, and
+    # Django refuses unique_fields there; the primary key decides anyway
+    connection = connections[router.db_for_write(TagStat)]
+    return ['tag'] if connection.features.supports_update_conflicts_with_target else None
+
+
+@transaction.atomic
+def rebuild_tag_stats():
+    """Recompute every tag's statistics; returns the number of tags in use."""
+    usage = tag_usage()
+    TagStat.objects.all().delete()
+    TagStat.objects.bulk_create(
+        TagStat(tag_id=tag_id, post_count=count, last_used=last_used)
+        for tag_id, (count, last_used) in usage.items()
+    )
+    invalidate_tag_cloud()
+    return len(usage)
+
+
+def invalidate_tag_cloud():
+    transaction.on_commit(lambda: cache.delete(TAG_CLOUD_CACHE_KEY))
+
+
+def get_tag_cloud():
+    """
+    The most used tags, alphabetised, each with a ``level`` from 1 to
+    TAG_CLOUD_LEVELS for sizing.
+    """
+    cloud = cache.get(TAG_CLOUD_CACHE_KEY)
+    if cloud is not None:
+        return cloud
+
+    stats = list(
+        TagStat.objects.filter(post_count__gt=0)
+        .select_related('tag')
+        .order_by('-post_count', '-last_used')[:getattr(settings, 'BLOG_TAG_CLOUD_SIZE', 30)]
+    )
+    cloud = []
+    if stats:
+        most, least = stats[0].post_count, stats[-1].post_count
+        spread = max(most - least, 1)
+        for stat in stats:
+            cloud.append({
+                'name': stat.tag.name,
+                'slug': stat.tag.slug,
+                'post_count': stat.post_count,
+                'level': 1 + (stat.post_count - least) * (TAG_CLOUD_LEVELS - 1) // spread,
+            })
+        cloud.sort(key=lambda entry: entry['name'].lower())
+    cache.set(TAG_CLOUD_CACHE_KEY, cloud, getattr(settings, 'BLOG_TAG_CLOUD_TIMEOUT', 300))
+    return cloud
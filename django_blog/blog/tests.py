@@ -1,3 +1,339 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from taggit.models import Tag
+
+from . import comments, fragments, search, tags
+from .models import Comment, Post, SearchIndexEntry, TagStat
+
+
+class BlogTestCase(TestCase):
+    def setUp(self):
+        # Anonymous pages are cached by the middleware; start every test cold
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = User.objects.create_user(username='author', password='testpass123')
+
+
+class SearchIndexTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tips = Post.objects.create(author=self.author, title='Django tips', content='Use the ORM wisely.')
+        self.garden = Post.objects.create(author=self.author, title='Gardening', content='Tomatoes love django music.')
+
+    def result_ids(self, query):
+        return [row['post_id'] for row in search.search(query)]
+
+    def test_title_matches_rank_above_content_matches(self):
+        self.assertEqual(self.result_ids('django'), [self.tips.pk, self.garden.pk])
+
+    def test_posts_matching_more_terms_rank_first(self):
+        self.assertEqual(self.result_ids('django tomatoes'), [self.garden.pk, self.tips.pk])
+
+    def test_edit_replaces_index_entries(self):
+        self.tips.content = 'Prefer select_related.'
+        self.tips.save()
+        self.assertEqual(self.result_ids('orm'), [])
+        self.assertEqual(self.result_ids('select_related'), [self.tips.pk])
+
+    def test_tags_are_indexed_and_follow_renames(self):
+        self.garden.tags.add('outdoors')
+        self.assertEqual(self.result_ids('outdoors'), [self.garden.pk])
+
+        tag = Tag.objects.get(name='outdoors')
+        tag.name = 'allotment'
+        tag.save()
+        self.assertEqual(self.result_ids('outdoors'), [])
+        self.assertEqual(self.result_ids('allotment'), [self.garden.pk])
+
+    def test_deleted_posts_leave_the_index(self):
+        self.tips.delete()
+        self.assertEqual(self.result_ids('django'), [self.garden.pk])
+
+    def test_accents_and_case_are_folded(self):
+        # Distinct terms here would collide on MySQL's accent-insensitive
+        # collations and fail the unique (term, post) constraint
+        cafe = Post.objects.create(author=self.author, title='Café Straße', content='cafe strasse CAFÉ')
+        self.assertEqual(
+            list(cafe.search_entries.order_by('term').values_list('term', flat=True)), ['cafe', 'strasse']
+        )
+        self.assertEqual(self.result_ids('cafe'), [cafe.pk])
+        self.assertEqual(self.result_ids('STRASSE'), [cafe.pk])
+
+    def test_stop_words_match_nothing(self):
+        self.assertEqual(self.result_ids('the and of'), [])
+
+    def test_search_view_keeps_rank_order(self):
+        response = self.client.get(reverse('blog:post-search'), {'q': 'django'})
+        self.assertEqual(list(response.context['posts']), [self.tips, self.garden])
+
+    def test_rebuild_command_restores_index(self):
+        SearchIndexEntry.objects.all().delete()
+        call_command('rebuild_search_index', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.result_ids('django'), [self.tips.pk, self.garden.pk])
+
+
+class ListingTests(BlogTestCase):
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(author=self.author, title=f'Post {i}', content='Content')
+            post.tags.add(f'tag{i}', 'common')
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_pages_run_constant_queries(self):
+        self.create_posts(2)
+        urls = [reverse('blog:home'), reverse('blog:posts-by-tag', args=['common']), reverse('blog:post-search')]
+        baseline = [self.count_queries(url) for url in urls]
+        self.create_posts(4)
+        self.assertEqual([self.count_queries(url) for url in urls], baseline)
+
+    def test_listing_defers_the_post_body(self):
+        self.create_posts(1)
+        post = Post.objects.for_listing().get()
+        self.assertEqual(post.get_deferred_fields(), {'content', 'content_html'})
+
+
+@override_settings(BLOG_COMMENTS_PAGE_SIZE=2)
+class CommentCursorTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, title='Thread', content='Content')
+        created_at = timezone.now()
+        self.comments = [
+            Comment.objects.create(post=self.post, author=self.author, content=f'Comment {i}') for i in range(5)
+        ]
+        # Two comments share a timestamp so the id has to break the tie
+        for i, comment in enumerate(self.comments):
+            Comment.objects.filter(pk=comment.pk).update(created_at=created_at + timedelta(seconds=min(i, 3)))
+
+    def test_cursor_walks_the_thread_newest_first(self):
+        contents, cursor = [], None
+        while True:
+            page = comments.get_comment_page(self.post.pk, cursor)
+            contents.extend(comment.content for comment in page.comments)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(contents, [f'Comment {i}' for i in range(4, -1, -1)])
+
+    def test_load_more_returns_json(self):
+        first = comments.get_comment_page(self.post.pk)
+        response = self.client.get(
+            reverse('blog:post-comments', args=[self.post.pk]),
+            {'cursor': first.next_cursor}, HTTP_ACCEPT='application/json',
+        )
+        data = response.json()
+        self.assertEqual([comment['content'] for comment in data['results']], ['Comment 2', 'Comment 1'])
+        self.assertIsNotNone(data['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('blog:post-comments', args=[self.post.pk]), {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TagStatTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = Post.objects.create(author=self.author, title='First', content='Content')
+        self.second = Post.objects.create(author=self.author, title='Second', content='Content')
+
+    def stats(self):
+        return dict(TagStat.objects.values_list('tag__name', 'post_count'))
+
+    def test_adding_and_removing_tags_recounts(self):
+        self.first.tags.add('django', 'python')
+        self.second.tags.add('django')
+        self.assertEqual(self.stats(), {'django': 2, 'python': 1})
+
+        self.first.tags.remove('django')
+        self.assertEqual(self.stats(), {'django': 1, 'python': 1})
+
+        self.first.tags.clear()
+        self.assertEqual(self.stats(), {'django': 1, 'python': 0})
+
+    def test_deleting_a_post_recounts_its_tags(self):
+        self.first.tags.add('django')
+        self.second.tags.add('django')
+        self.first.delete()
+        self.assertEqual(self.stats(), {'django': 1})
+
+    def test_last_used_is_the_newest_post(self):
+        self.first.tags.add('django')
+        self.second.tags.add('django')
+        self.assertEqual(TagStat.objects.get().last_used, self.second.published_date)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.first.tags.add('django')
+        TagStat.objects.update(post_count=42)
+        call_command('rebuild_tag_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), {'django': 1})
+
+    def test_upsert_leaves_out_the_conflict_target_on_mysql(self):
+        # MySQL raises NotSupportedError if unique_fields is passed at all
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch.object(TagStat.objects, 'bulk_create') as bulk_create:
+            self.first.tags.add('django')
+        self.assertIsNone(bulk_create.call_args.kwargs['unique_fields'])
+
+    def test_tag_cloud_is_cached_until_stats_change(self):
+        self.first.tags.add('django', 'python')
+        self.second.tags.add('django')
+        cloud = tags.get_tag_cloud()
+        self.assertEqual([(entry['name'], entry['level']) for entry in cloud], [('django', 5), ('python', 1)])
+
+        with self.assertNumQueries(0):
+            tags.get_tag_cloud()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.tags.add('flask')
+        self.assertIn('flask', [entry['name'] for entry in tags.get_tag_cloud()])
+
+
+class FragmentCacheTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Cached', content='Original body')
+        self.post.tags.add('django')
+        self.url = reverse('blog:post-detail', args=[self.post.pk])
+        # Logged in, so the whole-page cache middleware stays out of the way
+        self.client.force_login(self.reader)
+
+    def page(self):
+        return self.client.get(self.url).content.decode()
+
+    def test_new_comment_invalidates_the_thread(self):
+        self.assertIn('No comments yet.', self.page())
+        Comment.objects.create(post=self.post, author=self.author, content='First!')
+        self.assertIn('First!', self.page())
+
+    def test_deleted_comment_leaves_the_thread(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, content='Short lived')
+        self.assertIn('Short lived', self.page())
+        comment.delete()
+        self.assertNotIn('Short lived', self.page())
+
+    def test_retagging_invalidates_the_tag_list(self):
+        self.assertIn('django', self.page())
+        self.post.tags.set(['flask'])
+        page = self.page()
+        self.assertIn('flask', page)
+        self.assertNotIn('class="tag">django<', page)
+
+    def test_edit_moves_the_body_to_a_new_key(self):
+        self.assertIn('Original body', self.page())
+        self.post.content = 'Edited body'
+        self.post.save()
+        self.assertIn('Edited body', self.page())
+
+    def test_delete_drops_the_fragments(self):
+        self.page()
+        key = make_template_fragment_key(fragments.COMMENTS_FRAGMENT, [self.post.pk])
+        self.assertIsNotNone(cache.get(key))
+        self.post.delete()
+        self.assertIsNone(cache.get(key))
+
+    def test_comment_actions_are_only_shown_to_their_author(self):
+        own = Comment.objects.create(post=self.post, author=self.reader, content='Mine')
+        other = Comment.objects.create(post=self.post, author=self.author, content='Theirs')
+        edit_own = reverse('blog:edit-comment', args=[own.pk])
+        edit_other = reverse('blog:edit-comment', args=[other.pk])
+
+        page = self.page()
+        self.assertIn(edit_own, page)
+        self.assertNotIn(edit_other, page)
+
+        # The author has comments too; nobody's actions leak into the cache
+        self.client.force_login(self.author)
+        page = self.page()
+        self.assertIn(edit_other, page)
+        self.assertNotIn(edit_own, page)
+
+        self.client.logout()
+        page = self.page()
+        self.assertIn('Mine', page)
+        self.assertNotIn('comment-actions', page)
+
+
+class RenderPipelineTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, title='Rendered', content='First line\nsecond <b>line</b>')
+
+    def test_save_stores_escaped_html_and_excerpt(self):
+        self.assertEqual(self.post.content_html, '<p>First line<br>second &lt;b&gt;line&lt;/b&gt;</p>')
+        self.assertEqual(self.post.excerpt, 'First line second <b>line</b>')
+
+    def test_update_fields_including_content_re_renders(self):
+        self.post.content = 'Replaced'
+        self.post.save(update_fields=['content'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content_html, '<p>Replaced</p>')
+
+    def test_saving_a_deferred_post_keeps_the_stored_html(self):
+        post = Post.objects.defer('content').get(pk=self.post.pk)
+        post.title = 'Retitled'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.content_html, self.post.content_html)
+
+    def test_render_command_fills_in_and_invalidates_the_body(self):
+        self.client.force_login(self.author)
+        url = reverse('blog:post-detail', args=[self.post.pk])
+        self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(content_html='<p>Stale</p>')
+        self.assertNotIn('Stale', self.client.get(url).content.decode())
+
+        call_command('render_posts', stdout=StringIO())
+        self.assertIn('second &lt;b&gt;line', self.client.get(url).content.decode())
+
+        Post.objects.filter(pk=self.post.pk).update(content_html='')
+        call_command('render_posts', only_missing=True, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content_html, '<p>First line<br>second &lt;b&gt;line&lt;/b&gt;</p>')
+
+
+class AnonymousPageCacheTests(BlogTestCase):
+    # The blog caches every path for anonymous visitors (PATH_PREFIXES '/')
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, title='Cached page', content='Content')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        for url in (reverse('blog:home'), reverse('blog:post-detail', args=[self.post.pk])):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_query_string_gets_its_own_entry(self):
+        url = reverse('blog:post-search')
+        self.client.get(url, {'q': 'cached'})
+        self.assertEqual(self.client.get(url, {'q': 'other'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, {'q': 'cached'})['X-Cache'], 'HIT')
+
+    def test_logged_in_visitors_bypass_cache(self):
+        self.client.get(reverse('blog:home'))
+        self.client.force_login(self.author)
+        self.assertNotIn('X-Cache', self.client.get(reverse('blog:home')))
+
+    def test_pages_setting_cookies_are_not_stored(self):
+        # The login form sets the CSRF cookie, which must not be shared
+        self.client.get(reverse('blog:login'))
+        self.assertEqual(self.client.get(reverse('blog:login'))['X-Cache'], 'MISS')
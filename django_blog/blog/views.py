@@ -1,4 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.utils.functional import SimpleLazyObject
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -10,13 +12,10 @@ from django.views.generic import (
     DeleteView
 )
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.core.paginator import Paginator
 from .models import Post, Comment
 from .forms import UserRegistrationForm, UserUpdateForm, CommentForm, PostForm
-
-def home(request):
-    posts = Post.objects.all().order_by('-published_date')
-    return render(request, 'blog/home.html', {'posts': posts})
+from . import comments, fragments, search
 
 def register(request):
     if request.method == 'POST':
@@ -46,18 +45,19 @@ def profile(request):
 def post_search(request):
     query = request.GET.get('q')
     if query:
-        posts = Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct()
+        paginator = Paginator(search.search(query), 10)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        posts = search.load_posts(page_obj.object_list)
     else:
-        posts = Post.objects.all()
-    return render(request, 'blog/search_results.html', {'posts': posts, 'query': query})
-
-def posts_by_tag(request, tag_slug):
-    posts = Post.objects.filter(tags__slug=tag_slug)
-    return render(request, 'blog/home.html', {'posts': posts, 'tag': tag_slug})
+        paginator = Paginator(Post.objects.for_listing().order_by('-published_date'), 10)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        posts = page_obj.object_list
+    return render(request, 'blog/search_results.html', {
+        'posts': posts,
+        'query': query,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+    })
 
 class PostListView(ListView):
     model = Post
@@ -66,15 +66,68 @@ class PostListView(ListView):
     ordering = ['-published_date']
     paginate_by = 5
 
+    def get_queryset(self):
+        return super().get_queryset().for_listing()
+
+class PostByTagListView(PostListView):
+    def get_queryset(self):
+        return super().get_queryset().filter(tags__slug=self.kwargs['tag_slug'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['tag'] = self.kwargs['tag_slug']
+        return context
+
+# Function-style entry points share the class-based listing pipeline
+home = PostListView.as_view()
+posts_by_tag = PostByTagListView.as_view()
+
 class PostDetailView(DetailView):
     model = Post
     template_name = 'blog/post_detail.html'
-    
+    queryset = Post.objects.select_related('author').defer('content')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['comment_form'] = CommentForm()
+        # Lazy: only evaluated when the cached comment fragment is rebuilt
+        context['comment_page'] = SimpleLazyObject(lambda: comments.get_comment_page(self.object.pk))
+        # The cached thread is shared by every visitor and has no edit/delete
+        # links; viewers with comments of their own get it rendered for them
+        user = self.request.user
+        context['show_comment_actions'] = user.is_authenticated and Comment.objects.filter(
+            post=self.object, author=user
+        ).exists()
+        context['fragment_cache_timeout'] = fragments.get_timeout()
+        context['fragment_version'] = fragments.version(self.object)
         return context
 
+def post_comments(request, pk):
+    """
+    Next page of a post's comments for the "load more" button: an HTML
+    fragment by default, JSON when the client asks for it.
+    """
+    post = get_object_or_404(Post.objects.only('pk'), pk=pk)
+    try:
+        page = comments.get_comment_page(post.pk, request.GET.get('cursor'))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor.')
+
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'results': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'content': comment.content,
+                    'created_at': comment.created_at.isoformat(),
+                }
+                for comment in page.comments
+            ],
+            'next': page.next_url,
+        })
+    return render(request, 'blog/comment_list.html', {'comment_page': page, 'show_comment_actions': True})
+
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
     form_class = PostForm
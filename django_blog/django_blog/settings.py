@@ -12,10 +12,14 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Shared middleware and DRF mixins live in django_common/ at the repository root
+sys.path.append(str(BASE_DIR.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -44,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django_common.anonymous_cache.AnonymousCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -65,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.tag_cloud',
             ],
         },
     },
@@ -137,3 +143,21 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Seconds to keep cached post detail fragments (body, tags, comments)
+BLOG_FRAGMENT_CACHE_TIMEOUT = 600
+
+# Comments shown on the post page and per "load more" request
+BLOG_COMMENTS_PAGE_SIZE = 20
+
+# Sidebar tag cloud: number of tags shown and seconds it is cached
+BLOG_TAG_CLOUD_SIZE = 30
+BLOG_TAG_CLOUD_TIMEOUT = 300
+
+# Stale-while-revalidate cache for anonymous page views;
+# see django_common/anonymous_cache.py for the other options
+ANONYMOUS_CACHE = {
+    'PATH_PREFIXES': ('/',),
+    'TIMEOUT': 60,
+    'STALE_TIMEOUT': 600,
+}
@@ -0,0 +1,13 @@
+"""
+Code shared by the Django projects in this repository.
+
+- anonymous_cache: stale-while-revalidate response cache middleware for
+  anonymous GET requests (django_blog, advanced-api-project,
+  social_media_api).
+- conditional: ETag / conditional GET mixin for DRF views (api_project,
+  social_media_api).
+
+Each project's settings put the repository root on ``sys.path`` so this
+package can be imported; deploy the repository with the project, not the
+project directory alone.
+"""
@@ -0,0 +1,189 @@
+"""
+Stale-while-revalidate response cache for anonymous GET requests.
+
+Whole responses are cached per host, path, query string and Accept header.
+A cached response is served as-is for ANONYMOUS_CACHE['TIMEOUT'] seconds;
+for STALE_TIMEOUT seconds after that it is still served immediately while
+one background refresh rebuilds it. A per-key lock (cache.add) makes sure
+only one request rebuilds a given key at a time: on a cold miss the others
+wait briefly for its result instead of all hitting the database.
+
+Requests carrying a session or messages cookie or an Authorization header
+are never cached or served from the cache. Responses aren't stored if the
+view authenticated the request anyway, or if they set cookies, aren't
+200 OK, stream, or are marked private/no-store/no-cache.
+If the rebuild holding the lock produces such a response, the waiting
+requests go through to the view as soon as the lock is released, and the
+key skips the lock for UNCACHEABLE_TIMEOUT seconds.
+
+Place the middleware early, after SecurityMiddleware (and WhiteNoise), so
+the cached response includes the headers added by the middleware below it.
+"""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'anon-response',
+    # Seconds a response is served without revalidating
+    'TIMEOUT': 60,
+    # Further seconds a stale response may be served while it is refreshed
+    'STALE_TIMEOUT': 600,
+    # Seconds a rebuild may hold the per-key lock before another may start
+    'LOCK_TIMEOUT': 30,
+    # Seconds a cold miss waits for another request's rebuild
+    'LOCK_WAIT': 5,
+    # Seconds a key whose response couldn't be stored is passed straight
+    # through, without taking the lock
+    'UNCACHEABLE_TIMEOUT': 60,
+    'PATH_PREFIXES': ('/',),
+    # Refresh stale entries on a thread pool; when False the request that
+    # takes the lock rebuilds the entry itself
+    'BACKGROUND_REFRESH': True,
+    'REFRESH_WORKERS': 2,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ANONYMOUS_CACHE', {})}
+
+
+def get_executor(config):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=config['REFRESH_WORKERS'], thread_name_prefix='anon-cache-refresh'
+                )
+    return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'ANONYMOUS_CACHE' and _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+class AnonymousCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        if not self.is_cacheable_request(request, config):
+            return self.get_response(request)
+
+        cache = caches[config['CACHE_ALIAS']]
+        key = self.cache_key(request, config)
+        lock_key = f'{key}:lock'
+        uncacheable_key = f'{key}:uncacheable'
+
+        found = cache.get_many([key, uncacheable_key])
+        entry = found.get(key)
+        if entry is None and uncacheable_key in found:
+            return self.mark(self.get_response(request), 'MISS')
+        if entry is not None:
+            if time.time() < entry['fresh_until']:
+                return self.mark(entry['response'], 'HIT')
+            if cache.add(lock_key, True, config['LOCK_TIMEOUT']):
+                if not config['BACKGROUND_REFRESH']:
+                    return self.mark(self.rebuild(request, cache, key, lock_key, config), 'MISS')
+                get_executor(config).submit(
+                    self.refresh, self.replay_request(request), cache, key, lock_key, config
+                )
+            return self.mark(entry['response'], 'STALE')
+
+        if cache.add(lock_key, True, config['LOCK_TIMEOUT']):
+            return self.mark(self.rebuild(request, cache, key, lock_key, config), 'MISS')
+
+        # Someone else is building this entry; wait for it rather than
+        # sending another request through to the database
+        deadline = time.monotonic() + config['LOCK_WAIT']
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return self.mark(entry['response'], 'HIT')
+            if cache.get(lock_key) is None:
+                # The rebuild finished without storing a response
+                break
+        return self.mark(self.get_response(request), 'MISS')
+
+    def is_cacheable_request(self, request, config):
+        if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META:
+            return False
+        if settings.SESSION_COOKIE_NAME in request.COOKIES or 'messages' in request.COOKIES:
+            return False
+        return request.path.startswith(tuple(config['PATH_PREFIXES']))
+
+    def is_authenticated(self, request):
+        # Views may authenticate by other means (DRF copies its user back
+        # onto the request); never store what such a request was shown
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_authenticated
+
+    def is_cacheable_response(self, response):
+        if response.status_code != 200 or response.streaming or response.cookies:
+            return False
+        cache_control = response.get('Cache-Control', '')
+        return not any(directive in cache_control for directive in ('private', 'no-store', 'no-cache'))
+
+    def cache_key(self, request, config):
+        raw = '|'.join((request.get_host(), request.get_full_path(), request.META.get('HTTP_ACCEPT', '')))
+        return f"{config['KEY_PREFIX']}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    def rebuild(self, request, cache, key, lock_key, config):
+        try:
+            response = self.get_response(request)
+            if not self.is_cacheable_response(response):
+                # Let the next requests for this key skip the lock
+                cache.set(f'{key}:uncacheable', True, config['UNCACHEABLE_TIMEOUT'])
+            elif not self.is_authenticated(request):
+                entry = {'response': response, 'fresh_until': time.time() + config['TIMEOUT']}
+                cache.set(key, entry, config['TIMEOUT'] + config['STALE_TIMEOUT'])
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    def replay_request(self, request):
+        """
+        A new request for the same URL and headers as ``request``, for the
+        background refresh. The original still belongs to the client's
+        request cycle, which goes on to use and tear it down.
+        """
+        if isinstance(request, ASGIRequest):
+            return ASGIRequest(request.scope, BytesIO())
+        return WSGIRequest({**request.META, 'wsgi.input': BytesIO()})
+
+    def refresh(self, request, cache, key, lock_key, config):
+        try:
+            self.rebuild(request, cache, key, lock_key, config)
+        except Exception:
+            logger.exception('Refreshing cached response for %s failed', request.get_full_path())
+        finally:
+            # Worker threads hold their own connections; don't leak them
+            connections.close_all()
+
+    def mark(self, response, status):
+        response['X-Cache'] = status
+        return response
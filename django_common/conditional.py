@@ -0,0 +1,86 @@
+"""
+Conditional GET support for DRF list and retrieve views.
+
+ConditionalGetMixin works out a validator with one cheap query before
+anything is serialized, and answers 304 Not Modified when the client's
+If-None-Match (or, for single objects, If-Modified-Since) still matches:
+
+- cursor-paginated lists: the key and ``conditional_updated_field`` of each
+  row on the requested page, read with the paginator's own range query,
+  plus the page links; no COUNT and nothing outside the page is read;
+- other lists: the newest ``conditional_updated_field`` and the row count
+  of the filtered queryset. Page-number payloads carry that count anyway,
+  and unpaginated ones every row;
+- detail: the object's ``conditional_updated_field``, also sent as
+  Last-Modified.
+
+ETags also cover the user, the full URL (filters, page/cursor) and the
+negotiated media type, since those all change the payload. Anything that
+changes what a view serializes must touch the updated field, including
+queryset.update() calls, which skip auto_now.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    conditional_updated_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.make_etag(request, *self.list_validators(queryset))
+        return self.conditional_response(request, etag, None, super().list, args, kwargs)
+
+    def list_validators(self, queryset):
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is None:
+            validators = queryset.order_by().aggregate(
+                last_modified=Max(self.conditional_updated_field), count=Count('pk')
+            )
+            return validators['last_modified'], validators['count']
+
+        # Cursor pagination: the same page query, for just the keys it needs
+        fields = {'pk', self.conditional_updated_field}
+        fields.update(field.lstrip('-') for field in get_ordering(self.request, queryset, self))
+        rows = self.paginate_queryset(queryset.values(*fields))
+        return (
+            *((row['pk'], row[self.conditional_updated_field]) for row in rows),
+            self.paginator.get_next_link(),
+            self.paginator.get_previous_link(),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = (
+            self.filter_queryset(self.get_queryset())
+            .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+            .values_list(self.conditional_updated_field, flat=True)
+            .first()
+        )
+        if last_modified is None:
+            # Missing (or not visible to this user): let the view 404
+            return super().retrieve(request, *args, **kwargs)
+        etag = self.make_etag(request, last_modified)
+        return self.conditional_response(request, etag, last_modified, super().retrieve, args, kwargs)
+
+    def make_etag(self, request, *validators):
+        parts = [
+            request.get_full_path(),
+            str(request.user.pk),
+            request.accepted_media_type or '',
+            *(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in validators),
+        ]
+        return quote_etag(hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest())
+
+    def conditional_response(self, request, etag, last_modified, render, args, kwargs):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render(request, *args, **kwargs)
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,101 @@
+"""
+Single-statement follow and unfollow.
+
+``user.following.add()`` reads the existing follow rows before inserting
+and ``remove()`` reports every id it was given, so a follow from the API
+cost several round-trips and a bulk follow one query per account.
+follow_many() instead writes all rows with one INSERT ... SELECT that skips
+missing accounts, the follower themselves and existing rows (ON CONFLICT DO
+NOTHING / INSERT OR IGNORE / INSERT IGNORE), and RETURNING says which rows
+were created. unfollow() is a single DELETE.
+
+Neither goes through the related manager, so both send m2m_changed
+themselves with exactly the ids that changed; the counter, follow-graph and
+timeline receivers then run as they do for add() and remove().
+"""
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models.constants import OnConflict
+from django.db.models.signals import m2m_changed
+
+from .models import Follow
+
+User = get_user_model()
+
+
+def follow_many(follower, user_ids):
+    """
+    Make ``follower`` follow every account in ``user_ids``. Unknown ids, the
+    follower's own id and accounts already followed are skipped. Returns the
+    set of ids that were newly followed.
+    """
+    user_ids = {int(user_id) for user_id in user_ids} - {follower.pk}
+    if not user_ids:
+        return set()
+    using = router.db_for_write(Follow, instance=follower)
+    with transaction.atomic(using=using):
+        if connections[using].features.can_return_rows_from_bulk_insert:
+            created = _insert_returning(connections[using], follower.pk, user_ids)
+        else:
+            created = _insert_after_read(using, follower.pk, user_ids)
+        if created:
+            m2m_changed.send(
+                sender=Follow, action='post_add', instance=follower, reverse=True,
+                model=User, pk_set=created, using=using,
+            )
+    return created
+
+
+def follow(follower, user_id):
+    """Follow one account; True if a follow row was created."""
+    return bool(follow_many(follower, [user_id]))
+
+
+def unfollow(follower, user_id):
+    """Unfollow one account; True if a follow row was deleted."""
+    using = router.db_for_write(Follow, instance=follower)
+    with transaction.atomic(using=using):
+        deleted, _ = Follow.objects.using(using).filter(to_user_id=follower.pk, from_user_id=user_id).delete()
+        if deleted:
+            m2m_changed.send(
+                sender=Follow, action='post_remove', instance=follower, reverse=True,
+                model=User, pk_set={user_id}, using=using,
+            )
+    return bool(deleted)
+
+
+def _insert_returning_sql(connection, count):
+    qn = connection.ops.quote_name
+    user_pk = qn(User._meta.pk.column)
+    followed_column = qn(Follow._meta.get_field('from_user').column)
+    return (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} {qn(Follow._meta.db_table)} "
+        f"({followed_column}, {qn(Follow._meta.get_field('to_user').column)}) "
+        f"SELECT {user_pk}, %s FROM {qn(User._meta.db_table)} WHERE {user_pk} IN ({', '.join(['%s'] * count)}) "
+        f"{connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])} RETURNING {followed_column}"
+    )
+
+
+def _insert_returning(connection, follower_id, user_ids):
+    with connection.cursor() as cursor:
+        cursor.execute(_insert_returning_sql(connection, len(user_ids)), [follower_id, *user_ids])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _insert_after_read(using, follower_id, user_ids):
+    # No RETURNING (MySQL): work out the new rows first. A concurrent
+    # follow of the same account can slip in between and be counted twice;
+    # reconcile_follow_counts repairs that.
+    existing = set(
+        Follow.objects.using(using).filter(to_user_id=follower_id, from_user_id__in=user_ids).values_list(
+            'from_user_id', flat=True
+        )
+    )
+    targets = set(
+        User.objects.using(using).filter(pk__in=user_ids - existing).values_list('pk', flat=True)
+    )
+    if targets:
+        Follow.objects.using(using).bulk_create(
+            [Follow(from_user_id=pk, to_user_id=follower_id) for pk in targets], ignore_conflicts=True
+        )
+    return targets
@@ -0,0 +1,98 @@
+"""
+Cached adjacency lists for the follow graph.
+
+Each user's following and follower ids are kept in the cache as packed
+64-bit integer arrays, so hot graph reads (follow checks, feed assembly)
+are a cache lookup instead of a join over the followers M2M table. Misses
+for many users are filled with one query against the through table.
+
+Entries are invalidated whenever the follow relation changes (see
+accounts/signals.py), immediately and again on commit so a concurrent read
+can't re-cache the pre-commit state.
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+
+
+def get_timeout():
+    return getattr(settings, 'FOLLOW_GRAPH_CACHE_TIMEOUT', 3600)
+
+
+def cache_key(direction, user_id):
+    return f'graph:{direction}:{user_id}'
+
+
+def pack(ids):
+    return array('q', sorted(ids)).tobytes()
+
+
+def unpack(data):
+    ids = array('q')
+    ids.frombytes(data)
+    return frozenset(ids)
+
+
+def load_many(direction, user_ids):
+    """``{user_id: frozenset(ids)}`` for the given direction, cache first."""
+    user_ids = set(user_ids)
+    keys = {cache_key(direction, user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(keys)
+    result = {keys[key]: unpack(data) for key, data in cached.items()}
+
+    missing = user_ids - result.keys()
+    if missing:
+        loaded = {user_id: set() for user_id in missing}
+        if direction == FOLLOWING:
+            rows = Follow.objects.filter(to_user_id__in=missing).values_list('to_user_id', 'from_user_id')
+        else:
+            rows = Follow.objects.filter(from_user_id__in=missing).values_list('from_user_id', 'to_user_id')
+        for user_id, other_id in rows.iterator():
+            loaded[user_id].add(other_id)
+        cache.set_many(
+            {cache_key(direction, user_id): pack(ids) for user_id, ids in loaded.items()},
+            get_timeout(),
+        )
+        result.update((user_id, frozenset(ids)) for user_id, ids in loaded.items())
+    return result
+
+
+def following_ids(user_id):
+    return load_many(FOLLOWING, [user_id])[user_id]
+
+
+def follower_ids(user_id):
+    return load_many(FOLLOWERS, [user_id])[user_id]
+
+
+def following_ids_many(user_ids):
+    return load_many(FOLLOWING, user_ids)
+
+
+def follower_ids_many(user_ids):
+    return load_many(FOLLOWERS, user_ids)
+
+
+def is_following(user_id, other_id):
+    return other_id in following_ids(user_id)
+
+
+def invalidate(follower_ids=(), followed_ids=()):
+    """Drop cached lists touched by follows from ``follower_ids`` to ``followed_ids``."""
+    keys = [cache_key(FOLLOWING, user_id) for user_id in follower_ids]
+    keys += [cache_key(FOLLOWERS, user_id) for user_id in followed_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user(user_id):
+    invalidate(follower_ids=[user_id], followed_ids=[user_id])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from accounts import recommendations
+
+class Command(BaseCommand):
+    help = 'Precomputes "who to follow" suggestions for every user from the follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None,
+                            help='Suggestions kept per user (default: FOLLOW_SUGGESTIONS_SIZE)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of users computed and stored per transaction')
+
+    def handle(self, *args, **options):
+        engine = 'sparse matrix' if recommendations.has_sparse_backend() else 'pure Python'
+        stored = recommendations.rebuild_suggestions(size=options['size'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {stored} follow suggestions ({engine})'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from accounts.models import User
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized followers_count/following_count columns on users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of users recounted per UPDATE statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+
+        # Walk the table in primary key ranges so each UPDATE stays short
+        while True:
+            ids = list(
+                User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += User.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).recount_follow_counts()
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled follow counts for {updated} users'))
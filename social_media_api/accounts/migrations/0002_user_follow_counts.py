@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:47
+
+import accounts.models
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Follow = User.followers.through
+    followers_total = Follow.objects.filter(from_user=OuterRef('pk')).order_by().values('from_user').annotate(
+        total=Count('pk')
+    ).values('total')
+    following_total = Follow.objects.filter(to_user=OuterRef('pk')).order_by().values('to_user').annotate(
+        total=Count('pk')
+    ).values('total')
+    User.objects.update(
+        followers_count=Coalesce(Subquery(followers_total), 0),
+        following_count=Coalesce(Subquery(following_total), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', accounts.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
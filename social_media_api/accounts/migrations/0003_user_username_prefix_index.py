@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# Index for case-insensitive username prefix search (username__istartswith),
+# created per database vendor to match the SQL each backend generates.
+# PostgreSQL compares UPPER(username::text) with LIKE, which needs a
+# pattern_ops expression index.
+POSTGRES_FORWARD = [
+    "CREATE INDEX accounts_user_username_prefix_idx ON accounts_user "
+    "(UPPER(username::text) text_pattern_ops)",
+]
+POSTGRES_REVERSE = ["DROP INDEX IF EXISTS accounts_user_username_prefix_idx"]
+
+# SQLite's LIKE is case-insensitive and only uses a NOCASE index
+SQLITE_FORWARD = [
+    "CREATE INDEX accounts_user_username_prefix_idx ON accounts_user (username COLLATE NOCASE)",
+]
+SQLITE_REVERSE = ["DROP INDEX IF EXISTS accounts_user_username_prefix_idx"]
+
+# MySQL's default collations are case-insensitive, so the existing unique
+# index on username already serves LIKE 'prefix%'.
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def run_statements(schema_editor, reverse):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements is None:
+        return
+    for sql in statements[1 if reverse else 0]:
+        schema_editor.execute(sql)
+
+
+def create_prefix_index(apps, schema_editor):
+    run_statements(schema_editor, reverse=False)
+
+
+def drop_prefix_index(apps, schema_editor):
+    run_statements(schema_editor, reverse=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_follow_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
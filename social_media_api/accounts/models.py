@@ -1,10 +1,83 @@
-from django.contrib.auth.models import AbstractUser
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+class UserQuerySet(models.QuerySet):
+    def adjust_follow_counts(self, pairs, delta):
+        """
+        Add ``delta`` to the counters touched by each ``(follower_id,
+        followed_id)`` pair: following_count of the follower and
+        followers_count of the followed account.
+        """
+        touched = (
+            ('following_count', Counter(follower_id for follower_id, _ in pairs)),
+            ('followers_count', Counter(followed_id for _, followed_id in pairs)),
+        )
+        for field, counts in touched:
+            # One UPDATE per distinct increment, usually just one
+            by_amount = defaultdict(list)
+            for user_id, amount in counts.items():
+                by_amount[amount].append(user_id)
+            for amount, user_ids in by_amount.items():
+                self.filter(pk__in=user_ids).update(**{field: F(field) + amount * delta})
+
+    def recount_follow_counts(self):
+        """
+        Recompute followers_count/following_count from the follow table in
+        a single UPDATE. Returns the number of users updated.
+        """
+        followers_total = Follow.objects.filter(from_user=OuterRef('pk')).order_by().values('from_user').annotate(
+            total=Count('pk')
+        ).values('total')
+        following_total = Follow.objects.filter(to_user=OuterRef('pk')).order_by().values('to_user').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.update(
+            followers_count=Coalesce(Subquery(followers_total), 0),
+            following_count=Coalesce(Subquery(following_total), 0),
+        )
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
 
 class User(AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
     followers = models.ManyToManyField('self', symmetrical=False, related_name='following', blank=True)
-    
+    # Denormalized from the followers table; see accounts/signals.py
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = UserManager()
+
     def __str__(self):
         return self.username
+
+# The followers through table: Follow.from_user is the followed account,
+# Follow.to_user the follower
+Follow = User.followers.through
+
+class FollowSuggestion(models.Model):
+    """
+    Precomputed "who to follow" entry: ``suggested`` is followed by
+    ``mutual_count`` of the accounts ``user`` follows. Rebuilt offline by
+    the compute_follow_suggestions command; see accounts/recommendations.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    mutual_count = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['user', 'rank']
+        constraints = [
+            # Also the index behind the per-user lookup
+            models.UniqueConstraint(fields=['user', 'rank'], name='accounts_suggestion_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.suggested_id} for {self.user_id} ({self.mutual_count} mutual)'
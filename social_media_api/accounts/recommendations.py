@@ -0,0 +1,159 @@
+"""
+"Who to follow" suggestions.
+
+Candidates for a user are the accounts followed by the accounts they
+follow (2-hop neighbours), ranked by how many of those mutual connections
+point at them; accounts the user already follows, and the user
+themselves, are left out. Ties go to the lower id so reruns are stable.
+
+Computing this per request would mean a self-join of the followers table
+for every page view, so rebuild_suggestions() does it offline for everyone
+(see the compute_follow_suggestions command) and keeps the top
+FOLLOW_SUGGESTIONS_SIZE rows per user in FollowSuggestion. Reading them
+back is a single indexed query.
+
+The whole follow edge list is loaded into memory once per run. With NumPy
+and SciPy installed the 2-hop counts come from a sparse matrix product over
+batches of users; without them an equivalent pure-Python pass is used.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import graph
+from .models import Follow, FollowSuggestion, User
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+
+def get_size():
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_SIZE', 20)
+
+
+def has_sparse_backend():
+    return sparse is not None
+
+
+def load_edges():
+    """``(follower_id, followed_id)`` for every follow row."""
+    return list(Follow.objects.values_list('to_user_id', 'from_user_id').iterator(chunk_size=10000))
+
+
+def python_suggester(edges):
+    """
+    Return ``suggest(user_ids, size)``, which yields ``(user_id,
+    [(suggested_id, mutual_count), ...])`` best first, for the follow graph
+    given as ``(follower_id, followed_id)`` edges.
+    """
+    following = defaultdict(set)
+    for follower_id, followed_id in edges:
+        following[follower_id].add(followed_id)
+
+    def suggest(user_ids, size):
+        for user_id in user_ids:
+            followed = following.get(user_id, ())
+            mutuals = Counter()
+            for middle_id in followed:
+                mutuals.update(following.get(middle_id, ()))
+            for excluded_id in (user_id, *followed):
+                mutuals.pop(excluded_id, None)
+            yield user_id, heapq.nlargest(size, mutuals.items(), key=lambda item: (item[1], -item[0]))
+
+    return suggest
+
+
+def sparse_suggester(edges):
+    """python_suggester() as one sparse matrix product per batch of users."""
+    pairs = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    ids = np.unique(pairs)
+    # adjacency[i, j] == 1 when ids[i] follows ids[j]
+    rows, cols = np.searchsorted(ids, pairs[:, 0]), np.searchsorted(ids, pairs[:, 1])
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (rows, cols)), shape=(len(ids), len(ids))
+    )
+
+    def suggest(user_ids, size):
+        batch = np.array(user_ids, dtype=np.int64)
+        if not len(ids):
+            yield from ((user_id, []) for user_id in batch.tolist())
+            return
+        # Users without follow rows are absent from ids and get no suggestions
+        positions = np.searchsorted(ids, batch).clip(max=len(ids) - 1)
+        known = ids[positions] == batch
+        selector = sparse.csr_matrix(
+            (np.ones(known.sum(), dtype=np.int32), (np.flatnonzero(known), positions[known])),
+            shape=(len(batch), len(ids)),
+        )
+        followed = selector @ adjacency
+        two_hop = followed @ adjacency
+        # Drop accounts already followed and the user themselves
+        two_hop = sparse.csr_matrix(two_hop - two_hop.multiply(followed) - two_hop.multiply(selector))
+        two_hop.eliminate_zeros()
+
+        for row, user_id in enumerate(batch.tolist()):
+            begin, end = two_hop.indptr[row], two_hop.indptr[row + 1]
+            counts, candidates = two_hop.data[begin:end], ids[two_hop.indices[begin:end]]
+            best = np.lexsort((candidates, -counts))[:size]
+            yield user_id, list(zip(candidates[best].tolist(), counts[best].tolist()))
+
+    return suggest
+
+
+def rebuild_suggestions(size=None, batch_size=1000):
+    """
+    Recompute and store suggestions for every user, replacing the previous
+    run's rows one batch of users at a time. Returns the number of rows
+    stored.
+    """
+    size = get_size() if size is None else size
+    suggester = sparse_suggester if has_sparse_backend() else python_suggester
+    suggest = suggester(load_edges())
+    computed_at = timezone.now()
+    stored = 0
+    last_id = 0
+
+    # Walk users in primary key batches so each transaction stays short
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            break
+        rows = [
+            FollowSuggestion(
+                user_id=user_id, suggested_id=suggested_id, mutual_count=mutual_count,
+                rank=rank, computed_at=computed_at,
+            )
+            for user_id, suggestions in suggest(user_ids, size)
+            for rank, (suggested_id, mutual_count) in enumerate(suggestions)
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+        stored += len(rows)
+        last_id = user_ids[-1]
+    return stored
+
+
+def get_suggestions(user, limit=None):
+    """
+    Stored suggestions for ``user``, best first, as User objects carrying a
+    ``mutual_count`` attribute. Accounts followed since the last rebuild
+    are skipped.
+    """
+    followed = graph.following_ids(user.pk)
+    rows = FollowSuggestion.objects.filter(user=user).select_related('suggested').order_by('rank')
+    suggestions = []
+    for row in rows:
+        if row.suggested_id in followed:
+            continue
+        row.suggested.mutual_count = row.mutual_count
+        suggestions.append(row.suggested)
+    return suggestions[:limit]
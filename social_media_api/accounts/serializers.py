@@ -35,17 +35,19 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 class UserProfileSerializer(serializers.ModelSerializer):
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
-
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'bio', 
                  'profile_picture', 'followers_count', 'following_count')
-        read_only_fields = ('email',)
+        read_only_fields = ('email', 'followers_count', 'following_count')
+
+class SuggestedUserSerializer(UserProfileSerializer):
+    mutual_count = serializers.IntegerField(read_only=True)
 
-    def get_followers_count(self, obj):
-        return obj.followers.count()
+    class Meta(UserProfileSerializer.Meta):
+        fields = UserProfileSerializer.Meta.fields + ('mutual_count',)
 
-    def get_following_count(self, obj):
-        return obj.following.count()
\ No newline at end of file
+class BulkFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
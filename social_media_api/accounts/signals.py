@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from . import graph
+from .models import Follow
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=Follow)
+def sync_follow_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep the follow counters and the cached follow graph in step with the
+    followers table, for the API views and admin edits alike.
+    """
+    # reverse=True: instance.following changed, so instance is the follower
+    # and pk_set the followed accounts; reverse=False is the other way round.
+    related = instance.following if reverse else instance.followers
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() reports every id it was given; only count existing rows
+        existing = related.all() if action == 'pre_clear' else related.filter(pk__in=pk_set)
+        instance._removed_follow_ids = list(existing.values_list('pk', flat=True))
+        return
+    if action in ('post_remove', 'post_clear'):
+        # Senders without a pre_* step (accounts/follows.py) pass exact ids
+        pk_set, delta = instance.__dict__.pop('_removed_follow_ids', pk_set), -1
+    elif action == 'post_add':
+        delta = 1
+    else:
+        return
+    if not pk_set:
+        return
+
+    if reverse:
+        pairs = [(instance.pk, pk) for pk in pk_set]
+    else:
+        pairs = [(pk, instance.pk) for pk in pk_set]
+    User.objects.adjust_follow_counts(pairs, delta)
+    graph.invalidate(
+        follower_ids={follower for follower, _ in pairs},
+        followed_ids={followed for _, followed in pairs},
+    )
+
+
+@receiver(post_save, sender=User)
+def reset_new_user_graph(sender, instance, created, **kwargs):
+    # A new account has no follows; drop anything cached under a reused id
+    if created:
+        graph.invalidate_user(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def invalidate_deleted_user_graph(sender, instance, **kwargs):
+    # The follow rows cascade without m2m_changed; fix up the neighbours'
+    # counters and drop their cached lists
+    followers = list(instance.followers.values_list('pk', flat=True))
+    following = list(instance.following.values_list('pk', flat=True))
+    User.objects.adjust_follow_counts(
+        [(pk, instance.pk) for pk in followers] + [(instance.pk, pk) for pk in following], -1
+    )
+    graph.invalidate(follower_ids=[instance.pk, *followers], followed_ids=[instance.pk, *following])
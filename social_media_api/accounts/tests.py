@@ -1,9 +1,14 @@
-from django.test import TestCase
+import random
+from io import StringIO
+from unittest import skipUnless
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from posts.models import Post
+from posts.models import Post, TimelineEntry
+from . import graph, recommendations
 
 User = get_user_model()
 
@@ -57,3 +62,219 @@ class FeedTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)  # Should only see user2's post
         self.assertEqual(response.data['results'][0]['title'], 'Test Post 1')
+
+class FollowGraphTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.user3 = User.objects.create_user(username='testuser3', password='testpass123')
+        self.user1.following.add(self.user2, self.user3)
+        self.user2.following.add(self.user3)
+
+    def test_reads_are_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(graph.following_ids(self.user1.pk), {self.user2.pk, self.user3.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(graph.following_ids(self.user1.pk), {self.user2.pk, self.user3.pk})
+            self.assertTrue(graph.is_following(self.user1.pk, self.user2.pk))
+
+    def test_bulk_load_fills_misses_in_one_query(self):
+        graph.follower_ids(self.user3.pk)
+        with self.assertNumQueries(1):
+            followers = graph.follower_ids_many([self.user1.pk, self.user2.pk, self.user3.pk])
+        self.assertEqual(followers, {
+            self.user1.pk: frozenset(),
+            self.user2.pk: {self.user1.pk},
+            self.user3.pk: {self.user1.pk, self.user2.pk},
+        })
+
+    def test_follow_changes_invalidate_both_sides(self):
+        graph.following_ids(self.user1.pk)
+        graph.follower_ids(self.user3.pk)
+
+        self.user1.following.remove(self.user3)
+        self.assertEqual(graph.following_ids(self.user1.pk), {self.user2.pk})
+        self.assertEqual(graph.follower_ids(self.user3.pk), {self.user2.pk})
+
+        graph.following_ids(self.user2.pk)
+        self.user3.followers.clear()
+        self.assertEqual(graph.following_ids(self.user2.pk), frozenset())
+
+    def test_deleting_a_user_invalidates_neighbours(self):
+        graph.following_ids(self.user1.pk)
+        self.user3.delete()
+        self.assertEqual(graph.following_ids(self.user1.pk), {self.user2.pk})
+
+class FollowCountTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.user3 = User.objects.create_user(username='testuser3', password='testpass123')
+        self.client.force_authenticate(user=self.user1)
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.followers_count, user.following_count
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.client.post(reverse('follow-user', kwargs={'user_id': self.user2.id}))
+        self.assertEqual(self.counts(self.user1), (0, 1))
+        self.assertEqual(self.counts(self.user2), (1, 0))
+
+        self.client.post(reverse('unfollow-user', kwargs={'user_id': self.user2.id}))
+        self.assertEqual(self.counts(self.user1), (0, 0))
+        self.assertEqual(self.counts(self.user2), (0, 0))
+
+    def test_admin_style_edits_update_counters(self):
+        self.user3.followers.add(self.user1, self.user2)
+        self.assertEqual(self.counts(self.user3), (2, 0))
+        self.assertEqual(self.counts(self.user1), (0, 1))
+
+        # Removing someone who isn't a follower changes nothing
+        self.user1.followers.remove(self.user3)
+        self.assertEqual(self.counts(self.user1), (0, 1))
+
+        self.user3.followers.clear()
+        self.assertEqual(self.counts(self.user3), (0, 0))
+        self.assertEqual(self.counts(self.user2), (0, 0))
+
+    def test_deleting_a_user_updates_neighbours(self):
+        self.user1.following.add(self.user2)
+        self.user2.following.add(self.user3)
+        self.user2.delete()
+        self.assertEqual(self.counts(self.user1), (0, 0))
+        self.assertEqual(self.counts(self.user3), (0, 0))
+
+    def test_user_list_reads_counter_columns(self):
+        self.user1.following.add(self.user2, self.user3)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-list'))
+        counts = {user['username']: user['followers_count'] for user in response.data['results']}
+        self.assertEqual(counts, {'testuser1': 0, 'testuser2': 1, 'testuser3': 1})
+
+    def test_reconcile_command_repairs_drift(self):
+        self.user1.following.add(self.user2)
+        User.objects.update(followers_count=7, following_count=7)
+        call_command('reconcile_follow_counts', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.counts(self.user1), (0, 1))
+        self.assertEqual(self.counts(self.user2), (1, 0))
+        self.assertEqual(self.counts(self.user3), (0, 0))
+
+class UserDirectoryTests(APITestCase):
+    def setUp(self):
+        for username in ('alice', 'Albert', 'bob', 'alfred', 'carol'):
+            User.objects.create_user(username=username, password='testpass123')
+        self.client.force_authenticate(user=User.objects.get(username='bob'))
+
+    def usernames(self, response):
+        return [user['username'] for user in response.data['results']]
+
+    def test_directory_is_cursor_paginated_by_username(self):
+        response = self.client.get(reverse('user-list'), {'page_size': 2})
+        self.assertEqual(self.usernames(response), ['Albert', 'alfred'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.usernames(response), ['alice', 'bob'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.usernames(response), ['carol'])
+        self.assertIsNone(response.data['next'])
+
+    def test_search_matches_username_prefix_case_insensitively(self):
+        response = self.client.get(reverse('user-list'), {'search': 'AL'})
+        self.assertEqual(self.usernames(response), ['Albert', 'alfred', 'alice'])
+        response = self.client.get(reverse('user-list'), {'search': 'ob'})
+        self.assertEqual(self.usernames(response), [])
+
+class BulkFollowTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.others = [
+            User.objects.create_user(username=f'suggested{i}', password='testpass123') for i in range(5)
+        ]
+        self.client.force_authenticate(user=self.user1)
+
+    def test_bulk_follow_skips_self_missing_and_existing(self):
+        self.user1.following.add(self.others[0])
+        ids = [user.pk for user in self.others] + [self.user1.pk, 999999]
+        response = self.client.post(reverse('bulk-follow'), {'user_ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['followed'], sorted(user.pk for user in self.others[1:]))
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.following_count, 5)
+        self.assertEqual(graph.following_ids(self.user1.pk), {user.pk for user in self.others})
+
+    def test_bulk_follow_backfills_timelines_in_constant_queries(self):
+        for user in self.others:
+            Post.objects.create(author=user, title=f'By {user.username}', content='Content')
+        ids = [user.pk for user in self.others]
+        # INSERT ... RETURNING, two counter UPDATEs, timeline backfill (3)
+        # and the savepoint pair
+        with self.assertNumQueries(8):
+            self.client.post(reverse('bulk-follow'), {'user_ids': ids}, format='json')
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user1).count(), 5)
+
+    def test_bulk_follow_rejects_oversized_requests(self):
+        response = self.client.post(reverse('bulk-follow'), {'user_ids': list(range(1, 102))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_repeated_follow_is_idempotent(self):
+        url = reverse('follow-user', kwargs={'user_id': self.others[0].id})
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.others[0].refresh_from_db()
+        self.assertEqual(self.others[0].followers_count, 1)
+
+        url = reverse('unfollow-user', kwargs={'user_id': self.others[0].id})
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.others[0].refresh_from_db()
+        self.assertEqual(self.others[0].followers_count, 0)
+
+class FollowSuggestionTests(APITestCase):
+    def setUp(self):
+        self.user1, self.alice, self.bob, self.carol, self.dave = [
+            User.objects.create_user(username=name, password='testpass123')
+            for name in ('testuser1', 'alice', 'bob', 'carol', 'dave')
+        ]
+        self.user1.following.add(self.alice, self.bob)
+        self.alice.following.add(self.carol, self.dave)
+        self.bob.following.add(self.carol, self.user1)
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        self.client.force_authenticate(user=self.user1)
+
+    def suggestions(self):
+        response = self.client.get(reverse('follow-suggestions'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(user['username'], user['mutual_count']) for user in response.data]
+
+    def test_two_hop_accounts_ranked_by_mutual_count(self):
+        # Self (followed back by bob) and accounts already followed are left out
+        self.assertEqual(self.suggestions(), [('carol', 2), ('dave', 1)])
+
+    def test_accounts_followed_since_the_rebuild_are_skipped(self):
+        self.user1.following.add(self.carol)
+        self.assertEqual(self.suggestions(), [('dave', 1)])
+
+    def test_lookup_is_a_single_query(self):
+        graph.following_ids(self.user1.pk)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('follow-suggestions'))
+
+@skipUnless(recommendations.has_sparse_backend(), 'NumPy and SciPy are not installed')
+class SparseSuggesterTests(SimpleTestCase):
+    def test_matches_python_suggester(self):
+        rng = random.Random(25)
+        edges = {
+            (rng.randrange(1, 60), rng.randrange(1, 60)) for _ in range(600)
+        }
+        edges = [(follower, followed) for follower, followed in edges if follower != followed]
+        # Ids 60-64 have no follow rows at all
+        user_ids = list(range(1, 65))
+        for size in (1, 5, 100):
+            with self.subTest(size=size):
+                expected = list(recommendations.python_suggester(edges)(user_ids, size))
+                actual = list(recommendations.sparse_suggester(edges)(user_ids, size))
+                self.assertEqual(actual, expected)
+
+    def test_empty_graph(self):
+        suggest = recommendations.sparse_suggester([])
+        self.assertEqual(list(suggest([1, 2], 5)), [(1, []), (2, [])])
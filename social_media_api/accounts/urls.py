@@ -1,11 +1,13 @@
 from django.urls import path
-from .views import RegisterView, CustomLoginView, UserProfileView, FollowUserView, UnfollowUserView, UserListView
+from .views import RegisterView, CustomLoginView, UserProfileView, FollowUserView, BulkFollowView, UnfollowUserView, UserListView, FollowSuggestionsView
 
 urlpatterns = [
     path('users/', UserListView.as_view(), name='user-list'),
+    path('suggestions/', FollowSuggestionsView.as_view(), name='follow-suggestions'),
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', CustomLoginView.as_view(), name='login'),
     path('profile/', UserProfileView.as_view(), name='profile'),
+    path('follow/', BulkFollowView.as_view(), name='bulk-follow'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
 ]
\ No newline at end of file
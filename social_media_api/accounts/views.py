@@ -1,23 +1,41 @@
-from rest_framework import generics, permissions, status
+from rest_framework import filters, generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from .serializers import UserSerializer, UserProfileSerializer
+from social_media_api.pagination import UserDirectoryPagination
+from .serializers import BulkFollowSerializer, SuggestedUserSerializer, UserSerializer, UserProfileSerializer
 from .models import User as CustomUser
+from . import follows, recommendations
 
-class UserListView(generics.GenericAPIView):
+class UserListView(generics.ListAPIView):
+    """
+    User directory in username order. ``?search=`` matches a username
+    prefix (case-insensitive), which the accounts_user_username_prefix_idx
+    index serves; follower counts come from the denormalized columns.
+    """
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UserDirectoryPagination
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['^username']
 
     def get_queryset(self):
-        return CustomUser.objects.all()
+        return CustomUser.objects.only(*UserProfileSerializer.Meta.fields).order_by('username')
 
-    def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+class FollowSuggestionsView(generics.ListAPIView):
+    """
+    "Who to follow" for the current user, read from the suggestions stored
+    by compute_follow_suggestions.
+    """
+    serializer_class = SuggestedUserSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    filter_backends = []
+
+    def get_queryset(self):
+        return recommendations.get_suggestions(self.request.user)
 
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
@@ -59,14 +77,13 @@ class FollowUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, user_id):
-        user_to_follow = get_object_or_404(CustomUser, id=user_id)
+        user_to_follow = get_object_or_404(CustomUser.objects.only('username'), id=user_id)
         if request.user == user_to_follow:
             return Response(
                 {'error': 'You cannot follow yourself.'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if not request.user.following.filter(id=user_to_follow.id).exists():
-            request.user.following.add(user_to_follow)
+        if follows.follow(request.user, user_to_follow.pk):
             return Response(
                 {'message': f'You are now following {user_to_follow.username}'},
                 status=status.HTTP_200_OK
@@ -76,18 +93,27 @@ class FollowUserView(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+class BulkFollowView(APIView):
+    """Follow several accounts at once, e.g. suggestions during onboarding."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        followed = follows.follow_many(request.user, serializer.validated_data['user_ids'])
+        return Response({'followed': sorted(followed)}, status=status.HTTP_200_OK)
+
 class UnfollowUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, user_id):
-        user_to_unfollow = get_object_or_404(CustomUser, id=user_id)
+        user_to_unfollow = get_object_or_404(CustomUser.objects.only('username'), id=user_id)
         if request.user == user_to_unfollow:
             return Response(
                 {'error': 'You cannot unfollow yourself.'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if request.user.following.filter(id=user_to_unfollow.id).exists():
-            request.user.following.remove(user_to_unfollow)
+        if follows.unfollow(request.user, user_to_unfollow.pk):
             return Response(
                 {'message': f'You have unfollowed {user_to_unfollow.username}'},
                 status=status.HTTP_200_OK
@@ -0,0 +1,277 @@
+"""
+Notification dispatch.
+
+Views call notify() instead of creating Notification rows themselves. The
+event is handed to the configured backend once the surrounding transaction
+commits, and backends persist events in batches with bulk_create, keeping
+notification writes out of the like/comment request path.
+
+Configure with the NOTIFICATIONS_DISPATCH setting::
+
+    NOTIFICATIONS_DISPATCH = {
+        'BACKEND': 'notifications.dispatch.ThreadPoolBackend',
+        'OPTIONS': {'workers': 1, 'batch_size': 100, 'flush_interval': 0.5},
+    }
+"""
+import atexit
+import logging
+import queue
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .pubsub import get_broker, publish_notifications
+from .unread import increment_unread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'notifications.dispatch.ThreadPoolBackend'
+
+# Number of actor usernames kept on a coalesced notification
+RECENT_ACTORS_LIMIT = 3
+
+
+def build_event(recipient_id, actor_id, verb, target):
+    return {
+        'recipient_id': recipient_id,
+        'actor_id': actor_id,
+        'verb': verb,
+        # get_for_model is served from ContentType's in-process cache
+        'target_content_type_id': ContentType.objects.get_for_model(target).pk,
+        'target_object_id': target.pk,
+        'created_at': timezone.now(),
+    }
+
+
+def write_batch(events):
+    """
+    Persist a batch of events as Notification rows, coalescing them when
+    NOTIFICATIONS_COALESCE_WINDOW is set.
+    """
+    from .models import Notification
+
+    window = getattr(settings, 'NOTIFICATIONS_COALESCE_WINDOW', 0)
+    if window:
+        created, updated = coalesce_batch(events, timedelta(seconds=window))
+    else:
+        created = Notification.objects.bulk_create([
+            Notification(**event, actor_ids=[event['actor_id']]) for event in events
+        ])
+        updated = []
+
+    new_unread = Counter(notification.recipient_id for notification in created)
+    transaction.on_commit(lambda: increment_unread(new_unread))
+
+    # Push to live streams; rows without a pk (bulk_create on MySQL) are
+    # picked up by clients on their next list fetch.
+    if get_broker().has_subscribers({event['recipient_id'] for event in events}):
+        changed_ids = [notification.pk for notification in created if notification.pk] + updated
+        transaction.on_commit(lambda: publish_notifications(changed_ids))
+
+
+def coalesce_batch(events, window):
+    """
+    Fold events sharing recipient, verb and target into one notification.
+    Events are merged into an unread notification for the same key whose
+    window started within `window`, or else written as a single new row per
+    key. actor_count counts distinct actors, so an actor repeating an event
+    is not counted twice. Merging moves the row's created_at to the latest
+    event. Returns the newly created rows and the ids of the updated ones.
+    """
+    from django.contrib.auth import get_user_model
+    from .models import Notification
+
+    groups = {}
+    for event in events:
+        key = (event['recipient_id'], event['verb'],
+               event['target_content_type_id'], event['target_object_id'])
+        groups.setdefault(key, []).append(event)
+
+    actor_ids = {event['actor_id'] for event in events}
+    usernames = dict(get_user_model().objects.filter(pk__in=actor_ids).values_list('pk', 'username'))
+
+    def sample(group_events, existing=()):
+        names = []
+        for event in reversed(group_events):
+            name = usernames.get(event['actor_id'])
+            if name and name not in names:
+                names.append(name)
+        for name in existing:
+            if name not in names:
+                names.append(name)
+        return names[:RECENT_ACTORS_LIMIT]
+
+    with transaction.atomic():
+        candidates = Notification.objects.select_for_update().filter(
+            is_read=False,
+            window_started_at__gte=timezone.now() - window,
+            recipient_id__in={key[0] for key in groups},
+            verb__in={key[1] for key in groups},
+            target_object_id__in={key[3] for key in groups},
+        ).order_by('window_started_at')
+        existing = {}
+        for notification in candidates:
+            key = (notification.recipient_id, notification.verb,
+                   notification.target_content_type_id, notification.target_object_id)
+            existing.setdefault(key, notification)
+
+        new_rows = []
+        updated = []
+        for key, group_events in groups.items():
+            latest = group_events[-1]
+            # The same actor may repeat an event, e.g. by unliking and liking
+            group_actor_ids = list(dict.fromkeys(event['actor_id'] for event in group_events))
+            notification = existing.get(key)
+            if notification is None:
+                new_rows.append(Notification(
+                    **latest,
+                    window_started_at=group_events[0]['created_at'],
+                    actor_count=len(group_actor_ids),
+                    recent_actors=sample(group_events),
+                    actor_ids=group_actor_ids,
+                ))
+                continue
+            # The row is locked, so its actor_ids are current
+            new_actor_ids = [
+                actor_id for actor_id in group_actor_ids if actor_id not in notification.actor_ids
+            ]
+            # created_at follows the latest event so the row moves back to
+            # the top of the list; window_started_at keeps the window fixed
+            Notification.objects.filter(pk=notification.pk).update(
+                actor_id=latest['actor_id'],
+                created_at=latest['created_at'],
+                actor_count=F('actor_count') + len(new_actor_ids),
+                recent_actors=sample(group_events, notification.recent_actors),
+                actor_ids=notification.actor_ids + new_actor_ids,
+                timestamp=timezone.now(),
+            )
+            updated.append(notification.pk)
+        return Notification.objects.bulk_create(new_rows), updated
+
+
+class BaseBackend:
+    def enqueue(self, event):
+        raise NotImplementedError
+
+    def flush(self):
+        """Write out any events still held by the backend."""
+
+
+class ImmediateBackend(BaseBackend):
+    """Writes each event in the calling thread. Useful for tests and scripts."""
+
+    def enqueue(self, event):
+        write_batch([event])
+
+
+class ThreadPoolBackend(BaseBackend):
+    """
+    Buffers events in an in-process queue drained by daemon worker threads,
+    which write them in batches of up to batch_size.
+    """
+
+    def __init__(self, workers=1, batch_size=100, flush_interval=0.5):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def enqueue(self, event):
+        self.start()
+        self.queue.put(event)
+
+    def start(self):
+        if self.threads:
+            return
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self.run, name=f'notification-dispatch-{i}', daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def take_batch(self, block=True):
+        batch = []
+        try:
+            batch.append(self.queue.get(block=block, timeout=self.flush_interval if block else None))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def write(self, batch):
+        close_old_connections()
+        try:
+            write_batch(batch)
+        except Exception:
+            logger.exception('Failed to write %d notifications', len(batch))
+
+    def run(self):
+        while True:
+            batch = self.take_batch()
+            if batch:
+                self.write(batch)
+
+    def flush(self):
+        while True:
+            batch = self.take_batch(block=False)
+            if not batch:
+                break
+            self.write(batch)
+
+
+class DatabaseQueueBackend(BaseBackend):
+    """
+    Stores events in the QueuedNotification table, to be drained by the
+    process_notification_queue management command. A stand-in for an
+    external broker when notifications must survive process restarts.
+    """
+
+    def enqueue(self, event):
+        from .models import QueuedNotification
+
+        QueuedNotification.objects.create(**event)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'NOTIFICATIONS_DISPATCH', {})
+                backend_class = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+                _backend = backend_class(**config.get('OPTIONS', {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'NOTIFICATIONS_DISPATCH':
+        _backend = None
+
+
+def notify(recipient_id, actor_id, verb, target):
+    """Queue a notification for delivery after the current transaction commits."""
+    event = build_event(recipient_id, actor_id, verb, target)
+    transaction.on_commit(lambda: get_backend().enqueue(event))
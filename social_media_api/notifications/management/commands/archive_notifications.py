@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from notifications.retention import archive_read_notifications, retention_days
+
+class Command(BaseCommand):
+    help = 'Archives read notifications older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive read notifications older than this many days '
+                                 '(default: NOTIFICATIONS_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of notifications moved per transaction')
+        parser.add_argument('--output', default=None,
+                            help='Append archived rows to this JSONL file instead of the archive table')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        days = retention_days() if options['days'] is None else options['days']
+        kwargs = {'days': days, 'batch_size': options['batch_size'], 'pause': options['pause']}
+        if options['output']:
+            with open(options['output'], 'a') as output:
+                archived = archive_read_notifications(output=output, **kwargs)
+        else:
+            archived = archive_read_notifications(**kwargs)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} read notifications older than {days} days'
+        ))
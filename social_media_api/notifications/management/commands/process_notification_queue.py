@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from notifications.dispatch import write_batch
+from notifications.models import QueuedNotification
+
+EVENT_FIELDS = (
+    'recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id', 'created_at'
+)
+
+class Command(BaseCommand):
+    help = 'Writes queued notification events from the database dispatch queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of events written per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        processed = 0
+
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    QueuedNotification.objects.select_for_update(skip_locked=True)
+                    .order_by('pk').values('pk', *EVENT_FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+                pks = [row.pop('pk') for row in rows]
+                write_batch(rows)
+                QueuedNotification.objects.filter(pk__in=pks).delete()
+            processed += len(rows)
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} queued notifications'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Partial index for unread counts. It is kept out of Notification.Meta
+# because backends without partial indexes (MySQL) would warn (models.W037)
+# on every check; it is created only where it is supported.
+UNREAD_INDEX = models.Index(
+    fields=['recipient'], condition=models.Q(is_read=False), name='notification_unread_idx'
+)
+
+
+def create_unread_index(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        schema_editor.add_index(apps.get_model('notifications', 'Notification'), UNREAD_INDEX)
+
+
+def drop_unread_index(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        schema_editor.remove_index(apps.get_model('notifications', 'Notification'), UNREAD_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0003_coalescing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_unread_index, drop_unread_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+def backfill_actor_ids(apps, schema_editor):
+    # Earlier actors of coalesced rows weren't recorded; start from the latest
+    Notification = apps.get_model('notifications', 'Notification')
+    batch = []
+    for notification in Notification.objects.only('pk', 'actor_id').iterator(chunk_size=1000):
+        notification.actor_ids = [notification.actor_id]
+        batch.append(notification)
+        if len(batch) == 1000:
+            Notification.objects.bulk_update(batch, ['actor_ids'])
+            batch = []
+    Notification.objects.bulk_update(batch, ['actor_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_stream_messages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill_actor_ids, migrations.RunPython.noop),
+    ]
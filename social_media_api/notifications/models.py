@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -15,15 +16,73 @@ class Notification(models.Model):
     target_object_id = models.PositiveIntegerField()
     target = GenericForeignKey('target_content_type', 'target_object_id')
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the dispatcher when the event happens, not when it is written;
+    # coalescing moves it to the latest folded event so the row resurfaces
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     timestamp = models.DateTimeField(auto_now=True)  # Updated timestamp for any changes
     is_read = models.BooleanField(default=False)
+    # Coalesced notifications fold several actors into one row; `actor` is
+    # the most recent one, `recent_actors` a few of their usernames and
+    # `actor_ids` every distinct actor folded in so far.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+    actor_ids = models.JSONField(default=list, blank=True)
+    # When the first folded event happened; bounds the coalescing window
+    window_started_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', '-created_at']),
+            # The partial unread-count index lives in migration 0004, only
+            # on backends that support it
         ]
 
     def __str__(self):
         return f'{self.actor} {self.verb} {self.target}'
+
+class QueuedNotification(models.Model):
+    """A notification event waiting in the database-backed dispatch queue."""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    verb = models.CharField(max_length=255)
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    target_object_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f'Queued: {self.actor} {self.verb} {self.target_content_type} #{self.target_object_id}'
+
+class ArchivedNotification(models.Model):
+    """A read notification moved out of the live table by the retention job."""
+    original_id = models.BigIntegerField()
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    verb = models.CharField(max_length=255)
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    target_object_id = models.PositiveIntegerField()
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Archived: {self.actor} {self.verb} #{self.target_object_id}'
+
+class StreamMessage(models.Model):
+    """A serialized notification published through the database broker."""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f'Stream message #{self.pk} for {self.recipient_id}'
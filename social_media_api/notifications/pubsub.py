@@ -0,0 +1,190 @@
+"""
+Publish/subscribe for live notification delivery.
+
+The dispatcher publishes freshly written notifications here and the
+server-sent events stream subscribes per recipient. InProcessBroker only
+reaches subscribers connected to the same process; DatabaseBroker passes
+messages through a table so a dispatcher in a WSGI worker or in the queue
+command reaches streams served by any ASGI worker. Select one with the
+NOTIFICATIONS_BROKER setting; brokers share the same interface (publish,
+subscribe, unsubscribe, has_subscribers).
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROKER = 'notifications.pubsub.InProcessBroker'
+
+
+class InProcessBroker:
+    """
+    Delivers messages to asyncio queues owned by subscribers on any event
+    loop in this process. publish() may be called from any thread.
+    """
+    max_queue_size = 100
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Register the running event loop and return its message queue."""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue_size))
+        with self.lock:
+            self.subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self.lock:
+            self.subscribers[user_id].discard(subscription)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+
+    def has_subscribers(self, user_ids):
+        with self.lock:
+            return any(user_id in self.subscribers for user_id in user_ids)
+
+    def publish(self, user_id, message):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(user_id, ()))
+        for loop, queue in subscriptions:
+            loop.call_soon_threadsafe(self.deliver, queue, message)
+
+    @staticmethod
+    def deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Drop messages for clients that stopped reading
+            pass
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Stores published messages as StreamMessage rows. Each event loop with
+    subscribers runs one task that polls the table every poll_interval
+    seconds for its subscribers' messages and hands them to their queues.
+
+    Messages are read in id order, so a row committed after a higher id was
+    already read is missed; clients catch up on their next list fetch.
+    Rows older than message_max_age are deleted by the pollers.
+    """
+    poll_interval = 1.0
+    message_max_age = 300
+
+    def __init__(self):
+        super().__init__()
+        self.pollers = {}
+
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        loop = subscription[0]
+        with self.lock:
+            if loop not in self.pollers:
+                self.pollers[loop] = loop.create_task(self.poll(loop, timezone.now()))
+        return subscription
+
+    def has_subscribers(self, user_ids):
+        # Subscribers may be connected to any process
+        return True
+
+    def publish(self, user_id, message):
+        from .models import StreamMessage
+
+        StreamMessage.objects.create(recipient_id=user_id, payload=message)
+
+    def loop_queues(self, loop):
+        """Queues of this loop's subscribers by user id. Call with the lock held."""
+        queues = defaultdict(list)
+        for user_id, subscriptions in self.subscribers.items():
+            for subscription_loop, queue in subscriptions:
+                if subscription_loop is loop:
+                    queues[user_id].append(queue)
+        return queues
+
+    async def poll(self, loop, started_at):
+        last_id = None
+        last_pruned = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            with self.lock:
+                queues = self.loop_queues(loop)
+                if not queues:
+                    # Under the lock, so a new subscriber either finds this
+                    # poller still registered or starts its own
+                    del self.pollers[loop]
+                    return
+            try:
+                messages = await sync_to_async(self.fetch)(last_id, started_at, list(queues))
+            except Exception:
+                logger.exception('Failed to read stream messages')
+                continue
+            for message_id, user_id, payload in messages:
+                last_id = message_id
+                for queue in queues[user_id]:
+                    self.deliver(queue, payload)
+            if time.monotonic() - last_pruned > self.message_max_age:
+                await sync_to_async(self.prune)()
+                last_pruned = time.monotonic()
+
+    def fetch(self, last_id, started_at, user_ids):
+        from .models import StreamMessage
+
+        messages = StreamMessage.objects.filter(recipient_id__in=user_ids)
+        if last_id is None:
+            messages = messages.filter(created_at__gte=started_at)
+        else:
+            messages = messages.filter(pk__gt=last_id)
+        return list(messages.values_list('pk', 'recipient_id', 'payload'))
+
+    def prune(self):
+        from .models import StreamMessage
+
+        cutoff = timezone.now() - timedelta(seconds=self.message_max_age)
+        StreamMessage.objects.filter(created_at__lt=cutoff).delete()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'NOTIFICATIONS_BROKER', DEFAULT_BROKER)
+                _broker = import_string(path)()
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'NOTIFICATIONS_BROKER':
+        _broker = None
+
+
+def publish_notifications(notification_ids):
+    """Serialize notifications and publish them to their recipients' streams."""
+    from .models import Notification
+    from .serializers import NotificationSerializer
+
+    broker = get_broker()
+    notifications = Notification.objects.filter(pk__in=notification_ids).select_related(
+        'actor', 'target_content_type'
+    ).prefetch_related('target')
+    for notification in notifications:
+        broker.publish(notification.recipient_id, NotificationSerializer(notification).data)
@@ -0,0 +1,67 @@
+"""
+Retention for the notifications table.
+
+Read notifications older than NOTIFICATIONS_RETENTION_DAYS are moved to the
+ArchivedNotification table, or appended to a JSONL file, in small batches.
+Each batch is its own short transaction, so the job can run alongside live
+traffic; schedule archive_read_notifications() (or the
+archive_notifications management command) from cron or a task runner.
+"""
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+ARCHIVE_FIELDS = (
+    'recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id',
+    'actor_count', 'recent_actors', 'created_at',
+)
+
+
+def retention_days():
+    return getattr(settings, 'NOTIFICATIONS_RETENTION_DAYS', 90)
+
+
+def archive_read_notifications(days=None, batch_size=1000, output=None, pause=0):
+    """
+    Archive read notifications older than `days`. When `output` (an open
+    text file) is given, rows are written to it as JSON lines instead of
+    the archive table, after each batch commits. Returns the number of
+    notifications archived.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days() if days is None else days)
+    archived = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+                .select_for_update(skip_locked=True)
+                .order_by('pk').values('pk', *ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            pks = [row['pk'] for row in rows]
+            if output is None:
+                ArchivedNotification.objects.bulk_create([
+                    ArchivedNotification(original_id=row['pk'], **{field: row[field] for field in ARCHIVE_FIELDS})
+                    for row in rows
+                ])
+            Notification.objects.filter(pk__in=pks).delete()
+        if output is not None:
+            # Only once the delete has committed, so a rolled-back batch is
+            # not written again by the next run
+            for row in rows:
+                output.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            output.flush()
+        archived += len(rows)
+        if pause:
+            time.sleep(pause)
+
+    return archived
@@ -1,12 +1,42 @@
+from django.utils.text import Truncator
 from rest_framework import serializers
 from .models import Notification
 
+def target_summary(target):
+    """A short label for a notification target, e.g. a post title."""
+    title = getattr(target, 'title', None)
+    if title:
+        return title
+    content = getattr(target, 'content', None)
+    if content:
+        return Truncator(content).chars(80)
+    return str(target)
+
 class NotificationSerializer(serializers.ModelSerializer):
     actor = serializers.ReadOnlyField(source='actor.username')
     target_type = serializers.ReadOnlyField(source='target_content_type.model')
-    
+    target = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
         fields = ['id', 'actor', 'verb', 'target_type', 'target_object_id', 
-                 'created_at', 'is_read']
-        read_only_fields = ['created_at']
\ No newline at end of file
+                 'target', 'actor_count', 'recent_actors', 'created_at', 'is_read']
+        read_only_fields = ['created_at']
+
+    def get_target(self, obj):
+        # Resolved in bulk when the queryset uses prefetch_related('target')
+        target = obj.target
+        if target is None:
+            return None
+        return {'id': target.pk, 'summary': target_summary(target)}
+
+class BulkMarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=1000
+    )
+    before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('before' in attrs):
+            raise serializers.ValidationError("Provide either 'ids' or 'before'.")
+        return attrs
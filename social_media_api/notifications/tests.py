@@ -1,3 +1,398 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from unittest import mock
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from io import StringIO
+from django.core.cache import cache
+from django.core import signing
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from posts.models import Post, Comment
+from .dispatch import ThreadPoolBackend, build_event, write_batch
+from .models import ArchivedNotification, Notification, QueuedNotification, StreamMessage
+from .pubsub import DatabaseBroker, get_broker
+from .retention import archive_read_notifications
+from .views import event_stream, make_stream_token, read_stream_token
 
-# Create your tests here.
+User = get_user_model()
+
+class NotificationTestCase(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.post = Post.objects.create(author=self.user2, title='Test Post', content='Content')
+        self.client.force_authenticate(user=self.user1)
+
+    def like(self, post=None):
+        post = post or self.post
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('post-like', kwargs={'pk': post.pk}))
+
+class NotificationDispatchTests(NotificationTestCase):
+    @override_settings(NOTIFICATIONS_DISPATCH={'BACKEND': 'notifications.dispatch.ImmediateBackend'})
+    def test_like_and_comment_notify_post_author(self):
+        self.like()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Nice'})
+
+        verbs = set(Notification.objects.filter(recipient=self.user2).values_list('verb', flat=True))
+        self.assertEqual(verbs, {'liked', 'commented on'})
+        notification = Notification.objects.filter(recipient=self.user2).first()
+        self.assertEqual(notification.actor, self.user1)
+        self.assertEqual(notification.target, self.post)
+
+    @override_settings(NOTIFICATIONS_DISPATCH={'BACKEND': 'notifications.dispatch.ImmediateBackend'})
+    def test_no_notification_for_own_post(self):
+        own_post = Post.objects.create(author=self.user1, title='Mine', content='Content')
+        self.like(own_post)
+        self.assertFalse(Notification.objects.exists())
+
+    @override_settings(NOTIFICATIONS_COALESCE_WINDOW=0)
+    def test_thread_pool_backend_writes_in_batches(self):
+        backend = ThreadPoolBackend(batch_size=2)
+        for _ in range(5):
+            backend.queue.put(build_event(self.user2.pk, self.user1.pk, 'liked', self.post))
+        with self.assertNumQueries(3):
+            backend.flush()
+        self.assertEqual(Notification.objects.count(), 5)
+
+    @override_settings(NOTIFICATIONS_DISPATCH={'BACKEND': 'notifications.dispatch.DatabaseQueueBackend'})
+    def test_database_queue_backend(self):
+        response = self.like()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(QueuedNotification.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+        call_command('process_notification_queue', stdout=StringIO())
+        self.assertFalse(QueuedNotification.objects.exists())
+        self.assertEqual(Notification.objects.get().verb, 'liked')
+
+@override_settings(
+    NOTIFICATIONS_DISPATCH={'BACKEND': 'notifications.dispatch.ImmediateBackend'},
+    NOTIFICATIONS_COALESCE_WINDOW=3600,
+)
+class NotificationCoalescingTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.likers = [
+            User.objects.create_user(username=f'liker{i}', password='testpass123') for i in range(5)
+        ]
+
+    def like_as(self, user):
+        self.client.force_authenticate(user=user)
+        return self.like()
+
+    def test_likes_on_same_post_are_folded(self):
+        for user in self.likers:
+            self.like_as(user)
+
+        notification = Notification.objects.get(recipient=self.user2)
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual(notification.actor, self.likers[-1])
+        self.assertEqual(notification.recent_actors, ['liker4', 'liker3', 'liker2'])
+
+    def test_batch_is_folded_before_writing(self):
+        write_batch([build_event(self.user2.pk, user.pk, 'liked', self.post) for user in self.likers])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 5)
+
+    def test_repeated_actor_is_counted_once(self):
+        events = [build_event(self.user2.pk, user.pk, 'liked', self.post)
+                  for user in (self.likers[0], self.likers[1], self.likers[0])]
+        write_batch(events)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 2)
+
+        # Merging into the existing row only counts actors not seen yet
+        write_batch([build_event(self.user2.pk, user.pk, 'liked', self.post)
+                     for user in (self.likers[1], self.likers[2])])
+        notification.refresh_from_db()
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.actor_ids, [user.pk for user in self.likers[:3]])
+
+    def test_read_or_expired_notifications_are_not_reused(self):
+        self.like_as(self.likers[0])
+        Notification.objects.update(is_read=True)
+        self.like_as(self.likers[1])
+        self.assertEqual(Notification.objects.count(), 2)
+
+        with override_settings(NOTIFICATIONS_COALESCE_WINDOW=1):
+            Notification.objects.update(is_read=False, window_started_at=timezone.now() - timedelta(seconds=10))
+            self.like_as(self.likers[2])
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_merged_notification_moves_back_to_the_top(self):
+        other_post = Post.objects.create(author=self.user2, title='Other', content='Content')
+        self.like_as(self.likers[0])
+        self.client.force_authenticate(user=self.likers[1])
+        self.like(other_post)
+        self.like_as(self.likers[2])
+
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.get(reverse('notification-list'))
+        self.assertEqual([n['actor_count'] for n in response.data['results']], [2, 1])
+        merged = Notification.objects.get(actor_count=2)
+        self.assertGreater(merged.created_at, merged.window_started_at)
+
+    def test_different_targets_are_kept_apart(self):
+        other_post = Post.objects.create(author=self.user2, title='Other', content='Content')
+        self.like_as(self.likers[0])
+        self.client.force_authenticate(user=self.likers[1])
+        self.like(other_post)
+        self.assertEqual(Notification.objects.count(), 2)
+
+@override_settings(NOTIFICATIONS_DISPATCH={'BACKEND': 'notifications.dispatch.ImmediateBackend'})
+class UnreadCountTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse('unread-count')
+
+    def unread_count(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.get(self.url).data['unread_count']
+
+    def test_count_is_served_from_cache(self):
+        self.client.force_authenticate(user=self.user2)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).data['unread_count'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['unread_count'], 0)
+
+    def test_count_follows_new_and_read_notifications(self):
+        self.assertEqual(self.unread_count(self.user2), 0)
+        self.client.force_authenticate(user=self.user1)
+        self.like()
+        other_post = Post.objects.create(author=self.user2, title='Other', content='Content')
+        self.like(other_post)
+        self.assertEqual(self.unread_count(self.user2), 2)
+
+        notification = Notification.objects.filter(recipient=self.user2).first()
+        self.client.post(reverse('mark-read', kwargs={'pk': notification.pk}))
+        self.assertEqual(self.unread_count(self.user2), 1)
+
+        self.client.post(reverse('mark-all-read'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['unread_count'], 0)
+
+class NotificationStreamTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user2)
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get(reverse('notification-stream'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_api_token_is_not_accepted_in_the_url(self):
+        response = await self.async_client.get(reverse('notification-stream'), {'token': self.token.key})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_stream_token_is_single_purpose(self):
+        other_purpose = signing.dumps(self.user2.pk)
+        response = await self.async_client.get(reverse('notification-stream'), {'token': other_purpose})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_wsgi_requests_are_refused(self):
+        response = self.client.get(
+            reverse('notification-stream'), HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_stream_token_endpoint(self):
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.post(reverse('notification-stream-token'))
+        self.assertEqual(response.data['expires_in'], 60)
+        self.assertEqual(read_stream_token(response.data['token']), self.user2.pk)
+
+    @override_settings(NOTIFICATIONS_BROKER='notifications.pubsub.InProcessBroker')
+    async def test_stream_delivers_published_notifications(self):
+        response = await self.async_client.get(
+            reverse('notification-stream'), {'token': make_stream_token(self.user2.pk)}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        broker = get_broker()
+        self.assertTrue(broker.has_subscribers({self.user2.pk}))
+        # Publish from another thread, as the dispatcher's workers do
+        await asyncio.to_thread(broker.publish, self.user2.pk, {'verb': 'liked'})
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        self.assertEqual(chunk, b'event: notification\ndata: {"verb": "liked"}\n\n')
+
+
+    @override_settings(NOTIFICATIONS_BROKER='notifications.pubsub.InProcessBroker')
+    async def test_closing_stream_unsubscribes(self):
+        stream = event_stream(self.user1.pk)
+        await anext(stream)
+        self.assertTrue(get_broker().has_subscribers({self.user1.pk}))
+        await stream.aclose()
+        self.assertFalse(get_broker().has_subscribers({self.user1.pk}))
+
+@override_settings(NOTIFICATIONS_BROKER='notifications.pubsub.DatabaseBroker')
+class DatabaseBrokerTests(NotificationTestCase):
+    async def test_stream_receives_messages_published_by_another_process(self):
+        broker = get_broker()
+        broker.poll_interval = 0.01
+        stream = event_stream(self.user2.pk)
+        await anext(stream)
+        poller = broker.pollers[asyncio.get_running_loop()]
+
+        # A separate broker instance stands in for the dispatcher's process
+        await sync_to_async(DatabaseBroker().publish)(self.user2.pk, {'verb': 'liked'})
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        self.assertEqual(chunk, 'event: notification\ndata: {"verb": "liked"}\n\n')
+
+        # The poller stops with the last subscriber on its loop
+        await stream.aclose()
+        await asyncio.wait_for(poller, timeout=5)
+        self.assertEqual(broker.pollers, {})
+
+    @override_settings(NOTIFICATIONS_COALESCE_WINDOW=0)
+    def test_dispatcher_publishes_without_local_subscribers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            write_batch([build_event(self.user2.pk, self.user1.pk, 'liked', self.post)])
+        message = StreamMessage.objects.get()
+        self.assertEqual(message.recipient, self.user2)
+        self.assertEqual(message.payload['id'], Notification.objects.get().pk)
+
+    def test_old_messages_are_pruned(self):
+        broker = get_broker()
+        StreamMessage.objects.create(
+            recipient=self.user2, payload={},
+            created_at=timezone.now() - timedelta(seconds=broker.message_max_age + 1),
+        )
+        recent = StreamMessage.objects.create(recipient=self.user2, payload={})
+        broker.prune()
+        self.assertQuerySetEqual(StreamMessage.objects.all(), [recent])
+
+@override_settings(NOTIFICATIONS_COALESCE_WINDOW=0)
+class NotificationListTests(NotificationTestCase):
+    def test_page_resolves_targets_in_bulk(self):
+        events = []
+        for i in range(25):
+            post = Post.objects.create(author=self.user2, title=f'Post {i}', content='Content')
+            comment = Comment.objects.create(post=post, author=self.user1, content=f'Comment {i}')
+            events.append(build_event(self.user2.pk, self.user1.pk, 'liked', post))
+            events.append(build_event(self.user2.pk, self.user1.pk, 'commented on', comment))
+        write_batch(events)
+
+        self.client.force_authenticate(user=self.user2)
+        url = reverse('notification-list')
+        self.client.get(url)  # Warm the ContentType cache
+        # ETag validator, page query, then one target query each for posts
+        # and comments
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 50)
+
+        comment_item, post_item = response.data['results'][:2]
+        self.assertEqual(post_item['target_type'], 'post')
+        self.assertEqual(post_item['target']['summary'], 'Post 24')
+        self.assertEqual(comment_item['target']['summary'], 'Comment 24')
+
+    def test_marking_read_changes_etag(self):
+        write_batch([build_event(self.user2.pk, self.user1.pk, 'liked', self.post)])
+        self.client.force_authenticate(user=self.user2)
+        url = reverse('notification-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(reverse('mark-all-read'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'][0]['is_read'])
+
+    def test_deleted_target_is_null(self):
+        write_batch([build_event(self.user2.pk, self.user1.pk, 'liked', self.post)])
+        Post.objects.filter(pk=self.post.pk).delete()
+        # Deleting the post does not cascade to the generic relation
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.get(reverse('notification-list'))
+        self.assertIsNone(response.data['results'][0]['target'])
+
+@override_settings(NOTIFICATIONS_COALESCE_WINDOW=0, NOTIFICATIONS_RETENTION_DAYS=30)
+class NotificationRetentionTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        write_batch([build_event(self.user2.pk, self.user1.pk, 'liked', self.post) for _ in range(5)])
+        old = timezone.now() - timedelta(days=31)
+        ids = list(Notification.objects.values_list('pk', flat=True))
+        # Three old read rows, one old unread row and one recent read row
+        Notification.objects.filter(pk__in=ids[:4]).update(created_at=old, is_read=True)
+        Notification.objects.filter(pk=ids[3]).update(is_read=False)
+        Notification.objects.filter(pk=ids[4]).update(is_read=True)
+
+    def test_archive_to_table(self):
+        Notification.objects.update(recent_actors=['testuser1'])
+        call_command('archive_notifications', batch_size=2, stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(ArchivedNotification.objects.count(), 3)
+        archived = ArchivedNotification.objects.first()
+        self.assertEqual(archived.verb, 'liked')
+        self.assertEqual(archived.recent_actors, ['testuser1'])
+
+    def test_rolled_back_batch_is_not_written_to_jsonl(self):
+        output = StringIO()
+        with mock.patch.object(QuerySet, 'delete', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                archive_read_notifications(output=output)
+        self.assertEqual(output.getvalue(), '')
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_archive_to_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'archive.jsonl')
+            call_command('archive_notifications', output=path, stdout=StringIO())
+            with open(path) as archive:
+                rows = [json.loads(line) for line in archive]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['recipient_id'], self.user2.pk)
+        self.assertFalse(ArchivedNotification.objects.exists())
+        self.assertEqual(Notification.objects.count(), 2)
+
+@override_settings(NOTIFICATIONS_COALESCE_WINDOW=0)
+class BulkMarkReadTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        write_batch([build_event(self.user2.pk, self.user1.pk, 'liked', self.post) for _ in range(5)])
+        self.ids = list(Notification.objects.order_by('pk').values_list('pk', flat=True))
+        self.client.force_authenticate(user=self.user2)
+        self.url = reverse('bulk-mark-read')
+
+    def test_mark_read_by_ids_in_one_update(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'ids': self.ids[:3]}, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 2)
+
+    def test_mark_read_by_cutoff(self):
+        cutoff = Notification.objects.get(pk=self.ids[2]).created_at
+        Notification.objects.filter(pk__in=self.ids[3:]).update(created_at=cutoff + timedelta(minutes=1))
+        response = self.client.post(self.url, {'before': cutoff.isoformat()}, format='json')
+        self.assertEqual(response.data['updated'], 3)
+
+    def test_other_users_notifications_are_untouched(self):
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.post(self.url, {'ids': self.ids}, format='json')
+        self.assertEqual(response.data['updated'], 0)
+
+    def test_requires_exactly_one_selector(self):
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            self.url, {'ids': self.ids, 'before': timezone.now().isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
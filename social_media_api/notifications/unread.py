@@ -0,0 +1,45 @@
+"""
+Per-user unread notification counters kept in the cache.
+
+The counter is incremented as notification rows are written and reset when
+notifications are marked read. On a cache miss it is recomputed from the
+partial (recipient) WHERE is_read = false index.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def cache_timeout():
+    return getattr(settings, 'NOTIFICATIONS_UNREAD_CACHE_TIMEOUT', 300)
+
+
+def get_unread_count(user_id):
+    from .models import Notification
+
+    count = cache.get(cache_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.set(cache_key(user_id), count, cache_timeout())
+    return count
+
+
+def increment_unread(counts):
+    """Add new unread rows to cached counters, given {user_id: count}."""
+    for user_id, count in counts.items():
+        try:
+            cache.incr(cache_key(user_id), count)
+        except ValueError:
+            # Not cached; the next read recounts from the database
+            pass
+
+
+def reset_unread(user_id):
+    cache.set(cache_key(user_id), 0, cache_timeout())
+
+
+def invalidate_unread(user_id):
+    cache.delete(cache_key(user_id))
@@ -3,6 +3,10 @@ from . import views
 
 urlpatterns = [
     path('', views.NotificationListView.as_view(), name='notification-list'),
+    path('stream/', views.notification_stream, name='notification-stream'),
+    path('stream/token/', views.StreamTokenView.as_view(), name='notification-stream-token'),
+    path('unread-count/', views.UnreadCountView.as_view(), name='unread-count'),
     path('mark-read/', views.MarkNotificationReadView.as_view(), name='mark-all-read'),
+    path('mark-read/bulk/', views.BulkMarkNotificationsReadView.as_view(), name='bulk-mark-read'),
     path('mark-read/<int:pk>/', views.MarkNotificationReadView.as_view(), name='mark-read'),
 ]
\ No newline at end of file
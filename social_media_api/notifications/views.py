@@ -1,15 +1,40 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django_common.conditional import ConditionalGetMixin
+from social_media_api.pagination import DefaultListPagination
 from .models import Notification
-from .serializers import NotificationSerializer
+from .pubsub import get_broker
+from .serializers import BulkMarkReadSerializer, NotificationSerializer
+from .unread import get_unread_count, invalidate_unread, reset_unread
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DefaultListPagination
+    conditional_updated_field = 'timestamp'
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user).order_by('-created_at')
+        # Targets are loaded with one query per content type on the page
+        return Notification.objects.filter(recipient=self.request.user).select_related(
+            'actor', 'target_content_type'
+        ).prefetch_related('target').order_by('-created_at')
+
+class UnreadCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread_count': get_unread_count(request.user.pk)})
 
 class MarkNotificationReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -17,15 +42,14 @@ class MarkNotificationReadView(APIView):
     def post(self, request, pk=None):
         if pk:
             # Mark single notification as read
-            notification = Notification.objects.filter(
+            updated = Notification.objects.filter(
                 recipient=request.user,
                 id=pk,
                 is_read=False
-            ).first()
-            
-            if notification:
-                notification.is_read = True
-                notification.save()
+            ).update(is_read=True, timestamp=timezone.now())
+
+            if updated:
+                invalidate_unread(request.user.pk)
                 return Response({'message': 'Notification marked as read'})
             return Response(
                 {'error': 'Notification not found'},
@@ -36,5 +60,125 @@ class MarkNotificationReadView(APIView):
             Notification.objects.filter(
                 recipient=request.user,
                 is_read=False
-            ).update(is_read=True)
+            ).update(is_read=True, timestamp=timezone.now())
+            reset_unread(request.user.pk)
             return Response({'message': 'All notifications marked as read'})
+
+class BulkMarkNotificationsReadView(APIView):
+    """
+    Mark several notifications read in one UPDATE, selected either by
+    `ids` or by `before` (every notification created at or before it).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkMarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        notifications = Notification.objects.filter(recipient=request.user, is_read=False)
+        if 'ids' in serializer.validated_data:
+            notifications = notifications.filter(id__in=serializer.validated_data['ids'])
+        else:
+            notifications = notifications.filter(created_at__lte=serializer.validated_data['before'])
+
+        updated = notifications.update(is_read=True, timestamp=timezone.now())
+        if updated:
+            invalidate_unread(request.user.pk)
+        return Response({'updated': updated})
+
+
+STREAM_TOKEN_SALT = 'notifications.stream'
+
+
+def get_stream_token_max_age():
+    return getattr(settings, 'NOTIFICATIONS_STREAM_TOKEN_MAX_AGE', 60)
+
+
+def make_stream_token(user_id):
+    """
+    A signed token that only opens the notification stream and expires
+    after NOTIFICATIONS_STREAM_TOKEN_MAX_AGE seconds, for EventSource
+    clients, which can only authenticate through the URL.
+    """
+    return signing.dumps(user_id, salt=STREAM_TOKEN_SALT)
+
+
+def read_stream_token(value):
+    """The user id in a valid, unexpired stream token, else None."""
+    try:
+        return signing.loads(value, salt=STREAM_TOKEN_SALT, max_age=get_stream_token_max_age())
+    except signing.BadSignature:
+        return None
+
+
+class StreamTokenView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'token': make_stream_token(request.user.pk),
+            'expires_in': get_stream_token_max_age(),
+        })
+
+
+async def authenticate_stream(request):
+    """
+    Resolve the user from an `Authorization: Token <key>` header, or from a
+    stream token in the `token` query parameter since EventSource cannot
+    send headers. API tokens are never accepted in the URL, where proxies
+    and access logs would record them.
+    """
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        try:
+            token = await Token.objects.select_related('user').aget(key=header[len('Token '):])
+        except Token.DoesNotExist:
+            return None
+        user = token.user
+    else:
+        user_id = read_stream_token(request.GET.get('token', ''))
+        if user_id is None:
+            return None
+        user = await get_user_model().objects.filter(pk=user_id).afirst()
+    return user if user is not None and user.is_active else None
+
+
+async def event_stream(user_id):
+    broker = get_broker()
+    subscription = broker.subscribe(user_id)
+    _, queue = subscription
+    keepalive = getattr(settings, 'NOTIFICATIONS_STREAM_KEEPALIVE', 15)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: notification\ndata: {json.dumps(message)}\n\n'
+    finally:
+        broker.unsubscribe(user_id, subscription)
+
+
+async def notification_stream(request):
+    """
+    Server-sent events stream of new notifications for the current user.
+    Requires an ASGI server (see social_media_api/asgi.py).
+    """
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would drain the endless stream and never respond
+        return JsonResponse(
+            {'detail': 'The notification stream is only served by the ASGI application.'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    user = await authenticate_stream(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    response = StreamingHttpResponse(event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
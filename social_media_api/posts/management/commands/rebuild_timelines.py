@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from accounts.models import Follow
+from posts import timeline
+
+class Command(BaseCommand):
+    help = 'Backfills home timeline entries from the current follow graph'
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.order_by('from_user_id').values_list('to_user_id', 'from_user_id')
+        chunk = []
+        count = 0
+        # Ordered by author so each chunk's recent-posts query covers few authors
+        for pair in follows.iterator(chunk_size=timeline.batch_size()):
+            chunk.append(pair)
+            if len(chunk) >= timeline.batch_size():
+                timeline.backfill_timelines(chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            timeline.backfill_timelines(chunk)
+            count += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Backfilled timelines for {count} follow relationships'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from posts.models import Post
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized likes_count/comments_count columns on posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts recounted per UPDATE statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+
+        # Walk the table in primary key ranges so each UPDATE stays short
+        while True:
+            ids = list(
+                Post.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += Post.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).recount_counters()
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Recounted counters for {updated} posts'))
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:08
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+AUTHOR_CHUNK_SIZE = 500
+BATCH_SIZE = 1000
+
+
+def backfill_timelines(apps, schema_editor):
+    # Copy each followed author's recent posts into their followers'
+    # timelines, as posts.timeline.backfill_timelines does for new follows
+    app_label, model_name = settings.AUTH_USER_MODEL.split('.')
+    Follow = apps.get_model(app_label, model_name).followers.through
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    backfill_size = getattr(settings, 'TIMELINE_BACKFILL_SIZE', 100)
+    max_followers = getattr(settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 10000)
+
+    # Follow.from_user is the followed account, Follow.to_user the follower
+    author_ids = list(
+        Follow.objects.order_by('from_user_id').values('from_user_id').annotate(total=Count('pk')).filter(
+            total__lte=max_followers
+        ).values_list('from_user_id', flat=True)
+    )
+    for start in range(0, len(author_ids), AUTHOR_CHUNK_SIZE):
+        chunk = author_ids[start:start + AUTHOR_CHUNK_SIZE]
+        recent = Post.objects.filter(author_id__in=chunk).annotate(
+            rank=Window(RowNumber(), partition_by=F('author_id'), order_by=F('created_at').desc())
+        ).filter(rank__lte=backfill_size).values_list('author_id', 'pk', 'created_at')
+        posts_by_author = defaultdict(list)
+        for author_id, pk, created_at in recent:
+            posts_by_author[author_id].append((pk, created_at))
+        follows = Follow.objects.filter(from_user_id__in=posts_by_author).values_list('to_user_id', 'from_user_id')
+        entries = []
+        for user_id, author_id in follows.iterator(chunk_size=BATCH_SIZE):
+            entries.extend(
+                TimelineEntry(user_id=user_id, post_id=pk, created_at=created_at)
+                for pk, created_at in posts_by_author[author_id]
+            )
+            if len(entries) >= BATCH_SIZE:
+                TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+                entries = []
+        if entries:
+            TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='posts_timel_user_id_efcfd5_idx')],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+# Full-text index for posts.search, created per database vendor.
+# The PostgreSQL expression is the one SearchVector('title', 'content',
+# config='english') compiles to, so the planner can match it.
+POSTGRES_FORWARD = [
+    "CREATE INDEX posts_post_search_idx ON posts_post USING GIN "
+    "(to_tsvector('english'::regconfig, COALESCE(title, '') || ' ' || COALESCE(content, '')))",
+]
+POSTGRES_REVERSE = ["DROP INDEX IF EXISTS posts_post_search_idx"]
+
+MYSQL_FORWARD = ["ALTER TABLE posts_post ADD FULLTEXT INDEX posts_post_search_idx (title, content)"]
+MYSQL_REVERSE = ["ALTER TABLE posts_post DROP INDEX posts_post_search_idx"]
+
+# External-content FTS5 table kept in sync with posts_post by triggers.
+# Migrations that make SQLite rebuild posts_post drop the triggers with it
+# and have to put them back (see 0007_post_modified_at).
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF title, content ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+SQLITE_DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+    "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_post_fts_update",
+]
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "title, content, content='posts_post', content_rowid='id')",
+    *SQLITE_TRIGGERS,
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    *SQLITE_DROP_TRIGGERS,
+    "DROP TABLE IF EXISTS posts_post_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+    'mysql': (MYSQL_FORWARD, MYSQL_REVERSE),
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def run_statements(schema_editor, reverse):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements is None:
+        return
+    for sql in statements[1 if reverse else 0]:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    run_statements(schema_editor, reverse=False)
+
+
+def drop_search_index(apps, schema_editor):
+    run_statements(schema_editor, reverse=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
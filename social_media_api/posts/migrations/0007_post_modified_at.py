@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:33
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F
+
+search_index = import_module('posts.migrations.0005_post_search_index')
+
+
+def backfill_modified_at(apps, schema_editor):
+    # Start from the last edit so existing ETags keep validating
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(modified_at=F('updated_at'))
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite adds and removes this column by rebuilding posts_post, which
+    # drops the full-text index triggers on it
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in [*search_index.SQLITE_DROP_TRIGGERS, *search_index.SQLITE_TRIGGERS]:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_postsearchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_modified_at, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,66 @@
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce, Now
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
 User = get_user_model()
 
+class PostQuerySet(models.QuerySet):
+    def with_engagement(self, user, comments_limit=10):
+        """
+        Annotate the viewer's like status and prefetch a bounded slice of
+        recent comments with their authors, so serializing a page of posts
+        costs a fixed number of queries. Like/comment totals are read from
+        the denormalized counter columns.
+        """
+        if user.is_authenticated:
+            liked_by_user = Exists(Like.objects.filter(post=OuterRef('pk'), user=user))
+        else:
+            liked_by_user = Value(False, output_field=models.BooleanField())
+
+        return self.select_related('author').annotate(
+            liked_by_user=liked_by_user,
+        ).prefetch_related(
+            Prefetch(
+                'comments',
+                queryset=Comment.objects.select_related('author')[:comments_limit],
+                to_attr='recent_comments',
+            )
+        )
+
+    def recount_counters(self):
+        """
+        Recompute likes_count/comments_count from the Like and Comment tables
+        in a single UPDATE. Returns the number of posts updated.
+        """
+        comments_total = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+            total=Count('pk')
+        ).values('total')
+        likes_total = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.update(
+            comments_count=Coalesce(Subquery(comments_total), 0),
+            likes_count=Coalesce(Subquery(likes_total), 0),
+            modified_at=Now(),
+        )
+
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=200)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Conditional GET validator: moves with edits and with anything else
+    # shown alongside the post (counters, embedded comments)
+    modified_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, maintained with F() updates in the views
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
@@ -18,6 +68,22 @@ class Post(models.Model):
     def __str__(self):
         return self.title
 
+class PostSearchDocument(models.Model):
+    """
+    Row of the SQLite FTS5 table created in migration 0005, so the SQLite
+    search backend can join it to posts_post. Not used on other databases.
+    """
+    post = models.OneToOneField(
+        Post, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        related_name='search_document',
+    )
+    title = models.TextField()
+    content = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -42,3 +108,19 @@ class Like(models.Model):
 
     def __str__(self):
         return f'{self.user.username} likes {self.post.title}'
+
+class TimelineEntry(models.Model):
+    """A post fanned out into a follower's home timeline."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()  # Copied from the post for ordering
+
+    class Meta:
+        unique_together = ('user', 'post')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.post} in {self.user.username} timeline'
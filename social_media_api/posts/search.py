@@ -0,0 +1,104 @@
+"""
+Full-text search over post titles and content.
+
+Each backend filters a Post queryset to the matches of a query using the
+database's full-text index (created in migration 0005_post_search_index)
+and annotates a `search_rank` relevance score, higher is better. The
+backend is picked from the database vendor, or from the
+POSTS_SEARCH_BACKEND setting when it is set.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+
+class BaseSearchBackend:
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector matching served by the GIN expression index."""
+    config = 'english'
+
+    def search(self, queryset, query):
+        # Compiles to the same to_tsvector() expression as the index
+        vector = SearchVector('title', 'content', config=self.config)
+        search_query = SearchQuery(query, config=self.config)
+        return queryset.alias(search_vector=vector).filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(vector, search_query)
+        )
+
+
+class MySQLSearchBackend(BaseSearchBackend):
+    """Natural language MATCH ... AGAINST served by the FULLTEXT index."""
+    match = 'MATCH(posts_post.title, posts_post.content) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+
+    def search(self, queryset, query):
+        return queryset.filter(RawSQL(self.match, (query,), output_field=BooleanField())).annotate(
+            search_rank=RawSQL(self.match, (query,), output_field=FloatField())
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 external-content table ranked with bm25, for local development."""
+
+    @staticmethod
+    def fts_query(query):
+        # Quote each term so user input cannot use FTS5 query syntax
+        return ' '.join('"%s"' % term.replace('"', '""') for term in query.split())
+
+    def search(self, queryset, query):
+        # Join the FTS table once; MATCH and bm25() both read the joined row
+        return queryset.filter(
+            search_document__isnull=False,
+        ).filter(
+            RawSQL('posts_post_fts MATCH %s', (self.fts_query(query),), output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL('-bm25(posts_post_fts)', (), output_field=FloatField())
+        )
+
+
+class ContainsSearchBackend(BaseSearchBackend):
+    """Unindexed fallback for databases without a full-text backend."""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) | Q(content__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'mysql': MySQLSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connections[using].vendor, ContainsSearchBackend)()
+
+
+def search_posts(queryset, query):
+    """Filter posts to full-text matches of `query`, annotated with search_rank."""
+    return get_search_backend(queryset.db).search(queryset, query)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on PostViewSet that answers
+    ?search= from the full-text index instead of LIKE '%term%' scans.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_posts(queryset, query)
@@ -11,24 +11,25 @@ class CommentSerializer(serializers.ModelSerializer):
 
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
-    comments = CommentSerializer(many=True, read_only=True)
-    comments_count = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
+    comments = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = ['id', 'title', 'content', 'author', 'created_at', 
                  'updated_at', 'comments', 'comments_count', 'likes_count', 'is_liked']
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'comments_count', 'likes_count']
 
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+    def get_comments(self, obj):
+        comments = getattr(obj, 'recent_comments', None)
+        if comments is None:
+            comments = obj.comments.all()
+        return CommentSerializer(comments, many=True, context=self.context).data
 
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-    
     def get_is_liked(self, obj):
+        # Annotated by Post.objects.with_engagement()
+        if hasattr(obj, 'liked_by_user'):
+            return obj.liked_by_user
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -0,0 +1,31 @@
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from accounts.models import Follow
+from .models import Post, TimelineEntry
+from . import timeline
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(m2m_changed, sender=Follow)
+def sync_timeline_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    # user.following.add(author) arrives with reverse=True and the user as
+    # instance; author.followers.add(user) arrives with reverse=False.
+    if action == 'post_clear':
+        if reverse:
+            TimelineEntry.objects.filter(user=instance).delete()
+        else:
+            TimelineEntry.objects.filter(post__author=instance).delete()
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+
+    pairs = [(instance.pk, pk) if reverse else (pk, instance.pk) for pk in pk_set]
+    if action == 'post_add':
+        timeline.backfill_timelines(pairs)
+    else:
+        timeline.remove_from_timelines(pairs)
@@ -1,3 +1,406 @@
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from django_common.anonymous_cache import AnonymousCacheMiddleware, get_config
+from .models import Post, Comment, Like, TimelineEntry
+from .search import search_posts
+
+User = get_user_model()
+
+class PostListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.user1.following.add(self.user2)
+
+        # 60 posts, each with a couple of comments and likes from both users
+        for i in range(60):
+            post = Post.objects.create(author=self.user2, title=f'Post {i}', content='Content')
+            Comment.objects.create(post=post, author=self.user1, content='First')
+            Comment.objects.create(post=post, author=self.user2, content='Second')
+            Like.objects.create(user=self.user2, post=post)
+            if i % 2 == 0:
+                Like.objects.create(user=self.user1, post=post)
+        Post.objects.recount_counters()
+
+        self.client.force_authenticate(user=self.user1)
+
+    def assert_constant_queries(self, url, num_queries=3):
+        # The ETag validator, the annotated page query and the comment prefetch
+        for page_size in (5, 20, 50):
+            with self.assertNumQueries(num_queries):
+                response = self.client.get(url, {'page_size': page_size})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_post_list_query_count(self):
+        self.assert_constant_queries(reverse('post-list'))
+
+    def test_feed_query_count(self):
+        # Load the viewer's follow graph into the cache first
+        self.client.get(reverse('feed'))
+        # No validator, but the lookup of followed fan-out-on-read authors
+        self.assert_constant_queries(reverse('feed'), num_queries=3)
+
+    @override_settings(API_PAGINATION_STYLE='page')
+    def test_post_list_query_count_page_number(self):
+        # Page-number mode adds a COUNT(*)
+        self.assert_constant_queries(reverse('post-list'), num_queries=4)
+
+    def test_cursor_pagination_walks_all_posts(self):
+        url = reverse('post-list')
+        titles = []
+        params = {'page_size': 25}
+        while url:
+            with self.assertNumQueries(3):
+                response = self.client.get(url, params)
+            titles.extend(post['title'] for post in response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(titles, [f'Post {i}' for i in range(59, -1, -1)])
+
+    def test_feed_cursor_walks_timeline_index(self):
+        url, params, titles = reverse('feed'), {'page_size': 25}, []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            titles.extend(post['title'] for post in response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(titles, [f'Post {i}' for i in range(59, -1, -1)])
+        # The last page's query filters and sorts on the entry, not the post
+        page_sql = next(query['sql'] for query in queries if 'LIMIT' in query['sql'])
+        self.assertIn('"posts_timelineentry"."created_at" AS "feed_at"', page_sql)
+        self.assertIn('"posts_timelineentry"."created_at" <', page_sql)
+        self.assertNotIn('ORDER BY "posts_post"."created_at"', page_sql)
+
+    def test_post_list_annotations(self):
+        response = self.client.get(reverse('post-list'), {'page_size': 2})
+        first, second = response.data['results']
+        self.assertEqual(first['comments_count'], 2)
+        self.assertEqual(len(first['comments']), 2)
+        self.assertEqual(first['comments'][0]['author'], 'testuser2')
+        self.assertEqual(first['likes_count'], 1)
+        self.assertFalse(first['is_liked'])
+        self.assertEqual(second['likes_count'], 2)
+        self.assertTrue(second['is_liked'])
+
+    def test_post_retrieve_anonymous(self):
+        self.client.force_authenticate(user=None)
+        post = Post.objects.first()
+        response = self.client.get(reverse('post-detail', kwargs={'pk': post.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comments_count'], 2)
+        self.assertFalse(response.data['is_liked'])
+
+class PostCounterTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.post = Post.objects.create(author=self.user2, title='Test Post', content='Content')
+        self.client.force_authenticate(user=self.user1)
+
+    def test_like_and_unlike_update_counter(self):
+        url = reverse('post-like', kwargs={'pk': self.post.pk})
+        self.client.post(url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        # A duplicate like must not double count
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        self.client.delete(url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comment_create_and_destroy_update_counter(self):
+        response = self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Nice'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        self.client.delete(reverse('comment-detail', kwargs={'pk': response.data['id']}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        Like.objects.create(user=self.user1, post=self.post)
+        Comment.objects.create(post=self.post, author=self.user1, content='Drift')
+        Post.objects.filter(pk=self.post.pk).update(likes_count=42, comments_count=0)
+
+        call_command('recount_post_counters', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+
+class TimelineTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.client.force_authenticate(user=self.user1)
+
+    def feed_titles(self):
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.user1.following.add(self.user2)
+        post = Post.objects.create(author=self.user2, title='Fresh', content='Content')
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user1, post=post).exists())
+        self.assertEqual(self.feed_titles(), ['Fresh'])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        Post.objects.create(author=self.user2, title='Older', content='Content')
+        self.assertEqual(self.feed_titles(), [])
+
+        self.user1.following.add(self.user2)
+        self.assertEqual(self.feed_titles(), ['Older'])
+
+        self.user1.following.remove(self.user2)
+        self.assertEqual(self.feed_titles(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user1).exists())
+
+    def test_rebuild_command_restores_entries(self):
+        self.user1.following.add(self.user2)
+        Post.objects.create(author=self.user2, title='Kept', content='Content')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed_titles(), ['Kept'])
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_authors_are_read_on_demand(self):
+        self.user1.following.add(self.user2)
+        Post.objects.create(author=self.user2, title='Viral', content='Content')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), ['Viral'])
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        Post.objects.create(author=self.user1, title='Django tips', content='Use select_related wisely.')
+        Post.objects.create(author=self.user1, title='Gardening', content='Tomatoes love Django reinhardt music.')
+        Post.objects.create(author=self.user1, title='Cooking', content='Pasta all day.')
+        self.client.force_authenticate(user=self.user1)
+
+    def test_search_filter_uses_full_text_index(self):
+        response = self.client.get(reverse('post-list'), {'search': 'django'})
+        self.assertEqual({post['title'] for post in response.data['results']}, {'Django tips', 'Gardening'})
+
+    def test_search_action_ranks_by_relevance(self):
+        response = self.client.get(reverse('post-search'), {'q': 'django tips'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['title'] for post in response.data['results']], ['Django tips'])
+
+        response = self.client.get(reverse('post-search'), {'q': 'django'})
+        self.assertEqual(response.data['count'], 2)
+
+    def test_search_matches_fts_table_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(search_posts(Post.objects.all(), 'django'))
+        self.assertEqual(queries[0]['sql'].count('MATCH'), 1)
+
+    def test_index_follows_updates_and_deletes(self):
+        post = Post.objects.get(title='Cooking')
+        post.content = 'Now with Django'
+        post.save()
+        response = self.client.get(reverse('post-search'), {'q': 'pasta'})
+        self.assertEqual(response.data['count'], 0)
+        response = self.client.get(reverse('post-search'), {'q': 'django'})
+        self.assertEqual(response.data['count'], 3)
+
+        post.delete()
+        response = self.client.get(reverse('post-search'), {'q': 'django'})
+        self.assertEqual(response.data['count'], 2)
+
+    def test_search_input_is_not_query_syntax(self):
+        response = self.client.get(reverse('post-search'), {'q': 'django" OR "pasta'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_search_requires_query(self):
+        response = self.client.get(reverse('post-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class AnonymousCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        # Don't leave cached responses behind for other tests' clients
+        self.addCleanup(cache.clear)
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        Post.objects.create(author=self.user1, title='First', content='Content')
+        self.url = reverse('post-list')
+
+    def titles(self, response):
+        return [post['title'] for post in response.data['results']]
+
+    def test_anonymous_reads_are_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        Post.objects.create(author=self.user1, title='Second', content='Content')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.titles(response), ['First'])
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get(self.url)
+        token = Token.objects.create(user=self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Cache', response)
+
+    def test_responses_for_authenticated_users_are_not_stored(self):
+        self.client.force_authenticate(user=self.user1)
+        self.client.get(self.url)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    @override_settings(ANONYMOUS_CACHE={'PATH_PREFIXES': ('/api/posts/',), 'TIMEOUT': 0})
+    def test_stale_entry_served_while_another_request_refreshes(self):
+        self.client.get(self.url)
+        Post.objects.create(author=self.user1, title='Second', content='Content')
+
+        # Another request holds the refresh lock: serve the stale copy
+        key = AnonymousCacheMiddleware(None).cache_key(RequestFactory().get(self.url), get_config())
+        cache.add(f'{key}:lock', True)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(self.titles(response), ['First'])
+
+    @override_settings(ANONYMOUS_CACHE={'PATH_PREFIXES': ('/api/posts/',), 'TIMEOUT': 0, 'BACKGROUND_REFRESH': False})
+    def test_stale_entry_is_rebuilt_by_one_request(self):
+        self.client.get(self.url)
+        Post.objects.create(author=self.user1, title='Second', content='Content')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.titles(response), ['Second', 'First'])
+
+    def test_concurrent_misses_on_uncacheable_response_dont_wait(self):
+        def set_cookie(request):
+            time.sleep(0.3)
+            response = HttpResponse('Content')
+            response.set_cookie('csrftoken', 'token')
+            return response
+
+        middleware = AnonymousCacheMiddleware(set_cookie)
+
+        def timed_get(_):
+            started = time.monotonic()
+            response = middleware(RequestFactory().get(self.url))
+            return response['X-Cache'], time.monotonic() - started
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(timed_get, range(4)))
+        # Waiters fall through once the lock holder finishes, well before LOCK_WAIT
+        self.assertEqual({status for status, _ in results}, {'MISS'})
+        self.assertLess(max(elapsed for _, elapsed in results), 2)
+
+        # Later requests skip the lock altogether
+        key = middleware.cache_key(RequestFactory().get(self.url), get_config())
+        self.assertTrue(cache.get(f'{key}:uncacheable'))
+        cache.add(f'{key}:lock', True)
+        started = time.monotonic()
+        self.assertEqual(middleware(RequestFactory().get(self.url))['X-Cache'], 'MISS')
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_background_refresh_replays_a_fresh_request(self):
+        middleware = AnonymousCacheMiddleware(None)
+        request = RequestFactory().get(self.url, {'page_size': 5}, HTTP_ACCEPT='application/json')
+        request.user = self.user1
+        replay = middleware.replay_request(request)
+        self.assertIsNot(replay, request)
+        self.assertFalse(hasattr(replay, 'user'))
+        self.assertEqual(replay.get_full_path(), request.get_full_path())
+        self.assertEqual(middleware.cache_key(replay, get_config()), middleware.cache_key(request, get_config()))
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.post = Post.objects.create(author=self.user2, title='Test Post', content='Content')
+        self.client.force_authenticate(user=self.user1)
+
+    def test_unchanged_list_returns_not_modified(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+        # Only the validator query; nothing is serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_with_counters_and_deletes(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+        self.client.post(reverse('post-like', kwargs={'pk': self.post.pk}))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+
+        etag = response['ETag']
+        Post.objects.create(author=self.user2, title='Other', content='Content').delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.post.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_list_validator_reads_only_the_page(self):
+        url = reverse('post-list')
+        newer = Post.objects.create(author=self.user2, title='Newer', content='Content')
+        with CaptureQueriesContext(connection) as queries:
+            etag = self.client.get(url, {'page_size': 1})['ETag']
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        self.assertIn('LIMIT', queries[0]['sql'])
+
+        # Edits to posts on other pages don't invalidate this one
+        Post.objects.filter(pk=self.post.pk).update(title='Edited', modified_at=timezone.now())
+        response = self.client.get(url, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(reverse('post-like', kwargs={'pk': newer.pk}))
+        response = self.client.get(url, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_engagement_leaves_updated_at_alone(self):
+        updated_at = self.post.updated_at
+        self.client.post(reverse('post-like', kwargs={'pk': self.post.pk}))
+        self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Nice'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated_at, updated_at)
+        self.assertGreater(self.post.modified_at, updated_at)
+
+    def test_list_etag_is_per_user(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=self.user2)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_detail_honours_if_modified_since(self):
+        url = reverse('post-detail', kwargs={'pk': self.post.pk})
+        response = self.client.get(url)
+        last_modified = response['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Post.objects.filter(pk=self.post.pk).update(modified_at=self.post.modified_at + timedelta(minutes=1))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_detail_still_404s(self):
+        response = self.client.get(reverse('post-detail', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
-# Create your tests here.
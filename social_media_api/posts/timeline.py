@@ -0,0 +1,136 @@
+"""
+Materialized home timelines.
+
+Posts are fanned out on write into TimelineEntry rows for each follower, so a
+feed read is a range scan over the viewer's own entries. Authors with more
+than TIMELINE_FANOUT_MAX_FOLLOWERS followers are skipped on write and merged
+into the feed at read time instead (fan-out-on-read).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from accounts import graph
+from .models import Post, TimelineEntry
+
+User = get_user_model()
+
+
+def fanout_max_followers():
+    return getattr(settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 10000)
+
+
+def backfill_size():
+    return getattr(settings, 'TIMELINE_BACKFILL_SIZE', 100)
+
+
+def batch_size():
+    return getattr(settings, 'TIMELINE_BATCH_SIZE', 1000)
+
+
+def is_fanout_on_read(author_id):
+    return User.objects.filter(pk=author_id, followers_count__gt=fanout_max_followers()).exists()
+
+
+def fanout_on_read_author_ids(user):
+    """Ids of followed authors whose posts are not fanned out on write."""
+    followed = graph.following_ids(user.pk)
+    if not followed:
+        return []
+    return list(
+        User.objects.filter(pk__in=followed, followers_count__gt=fanout_max_followers()).values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def fan_out_post(post):
+    """Write a timeline entry for every follower of the post's author."""
+    if is_fanout_on_read(post.author_id):
+        return
+    entries = []
+    for user_id in graph.follower_ids(post.author_id):
+        entries.append(TimelineEntry(user_id=user_id, post_id=post.pk, created_at=post.created_at))
+        if len(entries) >= batch_size():
+            TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    if entries:
+        TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def backfill_timeline(user_id, author_id):
+    """Copy an author's most recent posts into a new follower's timeline."""
+    backfill_timelines([(user_id, author_id)])
+
+
+def backfill_timelines(pairs):
+    """
+    backfill_timeline() for many ``(user_id, author_id)`` pairs, with one
+    query for the authors' recent posts however many pairs there are.
+    """
+    pairs = list(pairs)
+    author_ids = {author_id for _, author_id in pairs}
+    author_ids -= set(
+        User.objects.filter(pk__in=author_ids, followers_count__gt=fanout_max_followers()).values_list(
+            'pk', flat=True
+        )
+    )
+    if not author_ids:
+        return
+    recent = Post.objects.filter(author_id__in=author_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('author_id'), order_by=F('created_at').desc())
+    ).filter(rank__lte=backfill_size()).values_list('author_id', 'pk', 'created_at')
+    posts_by_author = defaultdict(list)
+    for author_id, pk, created_at in recent:
+        posts_by_author[author_id].append((pk, created_at))
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, created_at=created_at)
+            for user_id, author_id in pairs
+            for pk, created_at in posts_by_author[author_id]
+        ],
+        ignore_conflicts=True,
+        batch_size=batch_size(),
+    )
+
+
+def remove_from_timeline(user_id, author_id):
+    remove_from_timelines([(user_id, author_id)])
+
+
+def remove_from_timelines(pairs):
+    """Drop each author's posts from the paired user's timeline, in one DELETE."""
+    authors_by_user = defaultdict(set)
+    for user_id, author_id in pairs:
+        authors_by_user[user_id].add(author_id)
+    condition = Q()
+    for user_id, author_ids in authors_by_user.items():
+        condition |= Q(user_id=user_id, post__author_id__in=author_ids)
+    if condition:
+        TimelineEntry.objects.filter(condition).delete()
+
+
+def feed_queryset(user, queryset=None):
+    """
+    Posts for the user's home feed, newest first by ``feed_at``. Reads the
+    user's timeline entries and merges in posts from fan-out-on-read
+    authors, if any.
+
+    ``feed_at`` is the timeline entry's created_at, so ordering and cursor
+    filters run on the (user, -created_at) timeline index rather than on
+    the joined post rows.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    celebrity_ids = fanout_on_read_author_ids(user)
+    if not celebrity_ids:
+        return queryset.filter(timeline_entries__user=user).annotate(
+            feed_at=F('timeline_entries__created_at')
+        ).order_by('-feed_at', '-id')
+    timeline_post_ids = TimelineEntry.objects.filter(user=user).values('post_id')
+    # Entries copy the post's created_at, so both sources agree on feed_at
+    return queryset.filter(
+        Q(pk__in=timeline_post_ids) | Q(author_id__in=celebrity_ids)
+    ).annotate(feed_at=F('created_at')).order_by('-feed_at', '-id')
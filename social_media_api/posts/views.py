@@ -1,13 +1,19 @@
 from rest_framework import viewsets, permissions, filters, generics, status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from .models import Post, Comment, Like
 from .serializers import PostSerializer, CommentSerializer
-from notifications.models import Notification
+from . import timeline
+from .search import FullTextSearchFilter, search_posts
+from notifications.dispatch import notify
+from django_common.conditional import ConditionalGetMixin
+from social_media_api.pagination import DefaultListPagination, FeedPagination, StandardResultsSetPagination
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -15,74 +21,105 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
             return True
         return obj.author == request.user
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
-    pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
+    pagination_class = DefaultListPagination
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     search_fields = ['title', 'content']
     filterset_fields = ['author']
     ordering_fields = ['created_at', 'updated_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    conditional_updated_field = 'modified_at'
+
+    def get_queryset(self):
+        return Post.objects.with_engagement(self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def retrieve(self, request, pk=None):
-        ["generics.get_object_or_404(Post, pk=pk)"]
-        post = get_object_or_404(Post, pk=pk)
-        serializer = self.get_serializer(post)
-        return Response(serializer.data)
+    @action(detail=False, pagination_class=StandardResultsSetPagination)
+    def search(self, request):
+        """Full-text search over title and content, most relevant first."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'The q query parameter is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = search_posts(self.get_queryset(), query).order_by('-search_rank', '-created_at', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = DefaultListPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['post', 'author']
     ordering_fields = ['created_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
 
     def perform_create(self, serializer):
-        comment = serializer.save(author=self.request.user)
-        # Create notification for post author
-        if comment.author != comment.post.author:
-            Notification.objects.create(
-                recipient=comment.post.author,
-                actor=self.request.user,
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user)
+            Post.objects.filter(pk=comment.post_id).update(
+                comments_count=F('comments_count') + 1, modified_at=timezone.now()
+            )
+        # Notify the post author once the comment is committed
+        if comment.author_id != comment.post.author_id:
+            notify(
+                recipient_id=comment.post.author_id,
+                actor_id=self.request.user.pk,
                 verb='commented on',
                 target=comment.post
             )
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            comment = serializer.save()
+            # Posts embed their recent comments; move the post's validators
+            Post.objects.filter(pk=comment.post_id).update(modified_at=timezone.now())
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            post_id = instance.post_id
+            instance.delete()
+            Post.objects.filter(pk=post_id).update(
+                comments_count=F('comments_count') - 1, modified_at=timezone.now()
+            )
+
 class FeedView(generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = FeedPagination
 
     def get_queryset(self):
-        following_users = self.request.user.following.all()
-        return Post.objects.filter(author__in=following_users).order_by('-created_at')
+        return timeline.feed_queryset(
+            self.request.user, Post.objects.with_engagement(self.request.user)
+        )
 
 class LikeView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(user=request.user, post=post)
+            if created:
+                Post.objects.filter(pk=post.pk).update(
+                    likes_count=F('likes_count') + 1, modified_at=timezone.now()
+                )
         
         if created:
-            # Create notification for post author
-            if request.user != post.author:
-                Notification.objects.create(
-                    recipient=post.author,
-                    actor=request.user,
+            # Notify the post author once the like is committed
+            if request.user.pk != post.author_id:
+                notify(
+                    recipient_id=post.author_id,
+                    actor_id=request.user.pk,
                     verb='liked',
                     target=post
                 )
@@ -95,10 +132,14 @@ class LikeView(APIView):
 
     def delete(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
-        like = Like.objects.filter(user=request.user, post=post).first()
-        
-        if like:
-            like.delete()
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(user=request.user, post=post).delete()
+            if deleted:
+                Post.objects.filter(pk=post.pk).update(
+                    likes_count=F('likes_count') - 1, modified_at=timezone.now()
+                )
+
+        if deleted:
             return Response({'message': 'Post unliked'}, status=status.HTTP_200_OK)
         
         return Response(
@@ -0,0 +1,87 @@
+from django.conf import settings
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination ordered by (created_at, id), newest first. Each page
+    is a range scan from the cursor's created_at position (ties broken by
+    id), so deep pages cost the same as the first one and no COUNT(*) is
+    issued.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class FeedCursorPagination(CreatedAtCursorPagination):
+    """
+    Keyset pagination for the home feed, on the ``feed_at`` annotation that
+    posts.timeline.feed_queryset() adds from the timeline entries.
+    """
+    ordering = ('-feed_at', '-id')
+
+
+class UsernameCursorPagination(CursorPagination):
+    """
+    Keyset pagination in username order, for the user directory. username
+    is unique, so it is a stable cursor on its own and each page is a range
+    scan of its unique index.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('username',)
+
+
+class DefaultListPagination(BasePagination):
+    """
+    Cursor pagination by default; set API_PAGINATION_STYLE = 'page' to keep
+    page-number pagination for clients that rely on ?page=N.
+    """
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    def __init__(self):
+        if getattr(settings, 'API_PAGINATION_STYLE', 'cursor') == 'page':
+            self.paginator = StandardResultsSetPagination()
+        else:
+            self.paginator = self.cursor_pagination_class()
+
+    def __getattr__(self, name):
+        # Expose attributes such as display_page_controls or cursor links
+        if name == 'paginator':
+            raise AttributeError(name)
+        return getattr(self.paginator, name)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def get_schema_operation_parameters(self, view):
+        return self.paginator.get_schema_operation_parameters(view)
+
+
+class FeedPagination(DefaultListPagination):
+    cursor_pagination_class = FeedCursorPagination
+
+
+class UserDirectoryPagination(DefaultListPagination):
+    cursor_pagination_class = UsernameCursorPagination
@@ -10,11 +10,15 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Shared middleware and DRF mixins live in django_common/ at the repository root
+sys.path.append(str(BASE_DIR.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -59,12 +63,48 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# List endpoints use keyset (cursor) pagination; set to 'page' to fall back
+# to page-number pagination.
+API_PAGINATION_STYLE = 'cursor'
+
+# Home timeline fan-out: authors with more followers than this are merged
+# into feeds at read time instead of being written to every follower.
+TIMELINE_FANOUT_MAX_FOLLOWERS = 10000
+# Number of recent posts copied into a timeline when following someone
+TIMELINE_BACKFILL_SIZE = 100
+
+# Seconds each user's cached following/follower id lists live; see
+# accounts/graph.py
+FOLLOW_GRAPH_CACHE_TIMEOUT = 3600
+# "Who to follow" suggestions kept per user by compute_follow_suggestions;
+# see accounts/recommendations.py
+FOLLOW_SUGGESTIONS_SIZE = 20
+
+# Notifications are written off the request path in batches; see
+# notifications/dispatch.py for the available backends.
+NOTIFICATIONS_DISPATCH = {
+    'BACKEND': 'notifications.dispatch.ThreadPoolBackend',
+    'OPTIONS': {'workers': 1, 'batch_size': 100, 'flush_interval': 0.5},
+}
+# Unread notifications with the same recipient, verb and target created
+# within this many seconds are folded into one row. 0 disables coalescing.
+NOTIFICATIONS_COALESCE_WINDOW = 3600
+# Carries live notifications from the dispatcher to streams in other
+# processes, such as the ASGI server next to the WSGI workers
+NOTIFICATIONS_BROKER = 'notifications.pubsub.DatabaseBroker'
+# Seconds a ?token= for the notification stream stays valid; clients fetch
+# one from /api/notifications/stream/token/ right before connecting
+NOTIFICATIONS_STREAM_TOKEN_MAX_AGE = 60
+# Read notifications older than this are moved out by archive_notifications
+NOTIFICATIONS_RETENTION_DAYS = 90
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add Whitenoise middleware after security and before all others
+    'django_common.anonymous_cache.AnonymousCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -159,3 +199,11 @@ SECURE_BROWSER_XSS_FILTER = True
 X_FRAME_OPTIONS = 'DENY'
 SECURE_CONTENT_TYPE_NOSNIFF = True
 SECURE_SSL_REDIRECT = True
+
+# Stale-while-revalidate cache for anonymous reads of the post endpoints;
+# see django_common/anonymous_cache.py for the other options
+ANONYMOUS_CACHE = {
+    'PATH_PREFIXES': ('/api/posts/',),
+    'TIMEOUT': 60,
+    'STALE_TIMEOUT': 600,
+}